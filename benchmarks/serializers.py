@@ -0,0 +1,46 @@
+"""Compares size and speed of session serializers.
+
+Usage: python benchmarks/serializers.py [number]
+"""
+from __future__ import print_function, unicode_literals
+
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from falcon_sessions.serializers import JSONSerializer, MsgpackSerializer, PickleSerializer
+
+
+def make_session_data():
+    return {
+        'user_id': 123456,
+        'username': 'user@example.com',
+        'roles': ['customer', 'beta'],
+        'csrf_token': 'f1c4b0bd3a1e4ac5a6a0b2c9d8e7f6a5',
+        'cart': [{'sku': 'SKU-{}'.format(i), 'quantity': i % 3 + 1, 'price': 9.99 * i} for i in range(20)],
+        'recently_viewed': list(range(1000, 1050)),
+        'flags': {'newsletter': True, 'dark_mode': False},
+    }
+
+
+def main(number=10000):
+    json_data = make_session_data()
+    data = dict(json_data, _session_expiry=datetime.utcnow() + timedelta(days=14))
+
+    serializers = [
+        ('pickle', PickleSerializer(), data),
+        ('json', JSONSerializer(), json_data),
+        ('msgpack', MsgpackSerializer(), data),
+    ]
+
+    print('{:<10}{:>10}{:>14}{:>14}'.format('', 'bytes', 'dumps, us', 'loads, us'))
+    for name, serializer, session_data in serializers:
+        serialized = serializer.dumps(session_data)
+        dumps = timeit.timeit(lambda: serializer.dumps(session_data), number=number)
+        loads = timeit.timeit(lambda: serializer.loads(serialized), number=number)
+        print('{:<10}{:>10}{:>14.2f}{:>14.2f}'.format(
+            name, len(serialized), dumps / number * 1e6, loads / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,29 @@
+import sys
+
+collect_ignore = []
+
+if sys.version_info < (3, 5):
+    collect_ignore += [
+        'falcon_sessions/backends/base_async.py',
+        'falcon_sessions/backends/redis_async.py',
+        'falcon_sessions/middleware_async.py',
+        'falcon_sessions/testing_async.py',
+        'tests/test_redis_session_storage_async.py',
+        'tests/test_session_middleware_async.py',
+    ]
+else:
+    try:
+        import falcon.asgi  # noqa
+    except ImportError:
+        collect_ignore += [
+            'falcon_sessions/testing_async.py',
+            'tests/test_session_middleware_async.py',
+        ]
+
+    try:
+        import redis.asyncio  # noqa
+    except ImportError:
+        collect_ignore += [
+            'falcon_sessions/backends/redis_async.py',
+            'tests/test_redis_session_storage_async.py',
+        ]
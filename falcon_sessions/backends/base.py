@@ -1,10 +1,13 @@
 from __future__ import unicode_literals
 
 import base64
+import hashlib
+import hmac
 from uuid import uuid4
 
 import six
 
+from ..compressors import compress, decompress
 from ..serializers import PickleSerializer
 from ..signers import Sha1Signer
 
@@ -13,30 +16,69 @@ class CorruptedSessionDataError(Exception):
     pass
 
 
-class AbstractSessionStorage(object):
+class BaseSessionStorage(object):
 
-    def __init__(self, serializer=None, signer=None):
+    """Encoding and signing of session data shared by sync and async storages.
+
+    Session data is encoded as a format byte followed by the raw signature
+    and the serialized data. Data in the legacy format, base64 of the hex
+    signature and the serialized data, is decoded as well.
+
+    :param serializer: serializer of session data. Default: PickleSerializer
+    :type serializer: AbstractSerializer
+    :param signer: signer of serialized data. Default: Sha1Signer
+    :type signer: AbstractSigner
+    :param compressor: compressor of serialized data. Compressed and
+        uncompressed data is decoded regardless of this option.
+        Default: None (no compression)
+    :type compressor: AbstractCompressor
+    :param legacy_encoding: whether to encode data in the legacy format, while
+        there are readers that don't support the binary format. Default: False
+    :type legacy_encoding: bool
+    """
+
+    # First byte of data encoded in the binary format. Data in the legacy
+    # format starts with a base64 character
+    binary_format = b'\x01'
+
+    def __init__(self, serializer=None, signer=None, compressor=None, legacy_encoding=False):
         self.serializer = serializer or PickleSerializer()
         self.signer = signer or Sha1Signer()
-
-    def get_new_session_key(self):
-        """Returns session key that isn't being used."""
-        while True:
-            session_key = uuid4().hex
-            if not self.exists(session_key):
-                return session_key
+        self.compressor = compressor
+        self.legacy_encoding = legacy_encoding
 
     def encode(self, session_data):
-        """Returns the given session data serialized and encoded as a string."""
-        serialized = self.serializer.dumps(session_data)
-        signature = self.signer.get_signature(serialized)
-        return base64.b64encode(signature.encode() + b':' + serialized).decode('ascii')
+        """Returns the given session data serialized and encoded as bytes,
+        or as a string in the legacy format.
+        """
+        serialized = compress(self.serializer.dumps(session_data), self.compressor)
+        if self.legacy_encoding:
+            signature = self.signer.get_signature(serialized)
+            return base64.b64encode(signature.encode() + b':' + serialized).decode('ascii')
+
+        return self.binary_format + self.signer.get_digest(serialized) + serialized
 
     def decode(self, session_data):
         """Returns decoded session data."""
-        if six.PY3 and isinstance(session_data, six.text_type):
+        if isinstance(session_data, six.text_type):
             session_data = session_data.encode('ascii')
 
+        if session_data[:1] != self.binary_format:
+            return self._decode_legacy(session_data)
+
+        data = memoryview(session_data)
+        signature_end = 1 + self.signer.digest_size
+        if len(data) < signature_end:
+            raise CorruptedSessionDataError("Session data has invalid format")
+
+        # Serializers and compressors get bytes, copied once
+        serialized = data[signature_end:].tobytes()
+        if not hmac.compare_digest(self.signer.get_digest(serialized), data[1:signature_end].tobytes()):
+            raise CorruptedSessionDataError("Session data is corrupted")
+
+        return self.serializer.loads(decompress(serialized, self.compressor))
+
+    def _decode_legacy(self, session_data):
         encoded_data = base64.b64decode(session_data)
         try:
             expected_signature, serialized = encoded_data.split(b':', 1)
@@ -44,27 +86,157 @@ class AbstractSessionStorage(object):
             raise CorruptedSessionDataError("Session data has invalid format")
 
         signature = self.signer.get_signature(serialized)
-        if signature != expected_signature.decode():
+        if not hmac.compare_digest(signature.encode('ascii'), expected_signature):
             raise CorruptedSessionDataError("Session data is corrupted")
 
-        return self.serializer.loads(serialized)
+        return self.serializer.loads(decompress(serialized, self.compressor))
+
+    def get_fingerprint(self, session_data):
+        """Returns a fingerprint of the session data as it would be stored.
+
+        Equal data usually has equal fingerprints, but a different fingerprint
+        doesn't guarantee that the data has changed.
+        """
+        return self.get_encoded_fingerprint(self.encode(session_data))
+
+    def get_encoded_fingerprint(self, session_data):
+        """Returns a fingerprint of the encoded session data."""
+        if isinstance(session_data, six.text_type):
+            session_data = session_data.encode('ascii')
+
+        return hashlib.sha1(session_data).hexdigest()
+
+
+class AbstractSessionStorage(BaseSessionStorage):
+
+    # Whether the storage implements get_version()
+    supports_versions = False
+
+    def get_new_session_key(self):
+        """Returns session key that isn't being used."""
+        while True:
+            session_key = uuid4().hex
+            if not self.exists(session_key):
+                return session_key
 
     def exists(self, session_key):
         raise NotImplementedError
 
     def create(self, session_data, expiry_age):
-        session_key = self.get_new_session_key()
+        while True:
+            session_key = uuid4().hex
+            if self.add(session_key, session_data, expiry_age):
+                return session_key
+
+    def add(self, session_key, session_data, expiry_age):
+        """Inserts session data if the session key isn't being used.
+
+        Returns ``True`` if the data has been inserted. Storages should
+        override this method with an atomic conditional insert.
+        """
+        if self.exists(session_key):
+            return False
+
         self.insert(session_key, session_data, expiry_age)
-        return session_key
+        return True
 
     def insert(self, session_key, session_data, expiry_age):
         raise NotImplementedError
 
+    def load(self, session_key):
+        """Returns session data or ``None`` if the session doesn't exist.
+
+        Storages should override this method to fetch the data in a single
+        operation instead of ``exists`` followed by ``read``.
+        """
+        if not self.exists(session_key):
+            return None
+
+        return self.read(session_key)
+
+    def load_with_fingerprint(self, session_key):
+        """Returns a tuple of session data and its fingerprint, or ``None``
+        if the session doesn't exist.
+
+        Storages that read encoded data should override this method to
+        fingerprint the data as it has been read.
+        """
+        session_data = self.load(session_key)
+        if session_data is None:
+            return None
+
+        return session_data, self.get_fingerprint(session_data)
+
     def read(self, session_key):
         raise NotImplementedError
 
     def update(self, session_key, session_data, expiry_age):
         raise NotImplementedError
 
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        """Writes changes of top-level keys of the session data.
+
+        ``session_data`` is the whole new session data, ``changed_keys`` and
+        ``deleted_keys`` are keys that have been set and deleted since the
+        session was loaded. By default the whole data is written.
+        """
+        self.update(session_key, session_data, expiry_age)
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        """Writes session data only if the stored data has the given
+        fingerprint, i.e. it hasn't been changed since it was loaded with
+        :meth:`load_with_fingerprint`.
+
+        Returns ``True`` if the data has been written, and ``False`` if the
+        session has been changed or doesn't exist.
+        """
+        raise NotImplementedError
+
     def delete(self, session_key):
         raise NotImplementedError
+
+    # Operations on many sessions. Storages should override them to
+    # send the operations in batches
+
+    def read_many(self, session_keys):
+        """Returns a dict of session keys and data of existing sessions."""
+        sessions = {}
+        for session_key in session_keys:
+            session_data = self.load(session_key)
+            if session_data is not None:
+                sessions[session_key] = session_data
+        return sessions
+
+    def update_many(self, sessions, expiry_age):
+        """Writes sessions from a dict of session keys and data."""
+        for session_key, session_data in sessions.items():
+            self.update(session_key, session_data, expiry_age)
+
+    def delete_many(self, session_keys):
+        for session_key in session_keys:
+            self.delete(session_key)
+
+    def touch_many(self, session_keys, expiry_age):
+        """Refreshes expiry of sessions. Returns a list of session keys
+        whose expiry has been refreshed.
+        """
+        return [session_key for session_key in session_keys if self.touch(session_key, expiry_age)]
+
+    def get_version(self, session_key):
+        """Returns a value that changes whenever the session data changes,
+        or ``None`` if the session doesn't exist. It should be cheaper than
+        reading the session.
+        """
+        raise NotImplementedError
+
+    def touch(self, session_key, expiry_age, threshold=0):
+        """Refreshes session expiry without rewriting session data.
+
+        If ``threshold`` is given, the expiry is refreshed only when this
+        fraction of ``expiry_age`` has elapsed since the last refresh.
+
+        Returns ``True`` if the session exists. Storages that can't refresh
+        the expiry separately return ``False``, and the session data is
+        written again instead.
+        """
+        return False
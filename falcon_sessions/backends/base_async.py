@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+from uuid import uuid4
+
+from .base import BaseSessionStorage
+
+
+class AbstractAsyncSessionStorage(BaseSessionStorage):
+
+    """Session storage with coroutine operations for asyncio applications.
+
+    Operations have the same meaning as in :class:`AbstractSessionStorage`.
+    """
+
+    async def exists(self, session_key):
+        raise NotImplementedError
+
+    async def create(self, session_data, expiry_age):
+        while True:
+            session_key = uuid4().hex
+            if await self.add(session_key, session_data, expiry_age):
+                return session_key
+
+    async def add(self, session_key, session_data, expiry_age):
+        if await self.exists(session_key):
+            return False
+
+        await self.insert(session_key, session_data, expiry_age)
+        return True
+
+    async def insert(self, session_key, session_data, expiry_age):
+        raise NotImplementedError
+
+    async def load(self, session_key):
+        if not await self.exists(session_key):
+            return None
+
+        return await self.read(session_key)
+
+    async def read(self, session_key):
+        raise NotImplementedError
+
+    async def update(self, session_key, session_data, expiry_age):
+        raise NotImplementedError
+
+    async def delete(self, session_key):
+        raise NotImplementedError
+
+    async def touch(self, session_key, expiry_age, threshold=0):
+        return False
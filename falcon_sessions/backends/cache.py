@@ -0,0 +1,210 @@
+from __future__ import unicode_literals
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from .base import AbstractSessionStorage
+
+
+class LocalCache(object):
+
+    """Thread-safe LRU cache with expiring entries.
+
+    :param maxsize: maximum number of entries
+    :type maxsize: int
+    :param ttl: number of seconds an entry is kept. Default: None (forever)
+    :type ttl: float
+    :param timer: function that returns the current time
+    :type timer: callable
+    """
+
+    __not_given = object()
+
+    def __init__(self, maxsize, ttl=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, self.__not_given) is not self.__not_given
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._entries.pop(key)
+            except KeyError:
+                return default
+
+            if expires_at is not None and expires_at <= self.timer():
+                return default
+
+            self._entries[key] = (expires_at, value)
+            return value
+
+    def set(self, key, value):
+        expires_at = None if self.ttl is None else self.timer() + self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedSessionStorage(AbstractSessionStorage):
+
+    """Storage that caches decoded session data in process memory.
+
+    Writes go through to the wrapped storage and update the cache. Cached
+    data is copied on every read and write, so a session modified by a
+    request never changes the cached data.
+
+    :param storage: wrapped storage
+    :type storage: AbstractSessionStorage
+    :param maxsize: maximum number of cached sessions. Default: 1024
+    :type maxsize: int
+    :param ttl: number of seconds a session is cached. Default: 1
+    :type ttl: float
+    :param validate: whether to compare the version of a cached session with
+        ``storage.get_version()`` before returning it. The storage must
+        support versions. Default: False
+    :type validate: bool
+    """
+
+    def __init__(self, storage, maxsize=1024, ttl=1, validate=False):
+        if validate and not storage.supports_versions:
+            raise ValueError('{} does not support versions'.format(type(storage).__name__))
+
+        super(CachedSessionStorage, self).__init__(
+            serializer=storage.serializer, signer=storage.signer, compressor=storage.compressor)
+        self.storage = storage
+        self.validate = validate
+        self.cache = LocalCache(maxsize, ttl)
+
+    def _cache_session(self, session_key, session_data, version=None):
+        if self.validate and version is None:
+            # The version of written data is unknown until it is read again
+            self.cache.pop(session_key)
+        else:
+            self.cache.set(session_key, (version, copy.deepcopy(session_data)))
+
+    def exists(self, session_key):
+        if not self.validate and session_key in self.cache:
+            return True
+
+        return self.storage.exists(session_key)
+
+    def insert(self, session_key, session_data, expiry_age):
+        self.storage.insert(session_key, session_data, expiry_age)
+        self._cache_session(session_key, session_data)
+
+    def add(self, session_key, session_data, expiry_age):
+        if not self.storage.add(session_key, session_data, expiry_age):
+            return False
+
+        self._cache_session(session_key, session_data)
+        return True
+
+    def load(self, session_key):
+        entry = self.cache.get(session_key)
+        version = None
+        if self.validate:
+            version = self.storage.get_version(session_key)
+
+        if entry is not None and (not self.validate or entry[0] == version):
+            return copy.deepcopy(entry[1])
+
+        session_data = self.storage.load(session_key)
+        if session_data is None:
+            self.cache.pop(session_key)
+            return None
+
+        self.cache.set(session_key, (version, copy.deepcopy(session_data)))
+        return session_data
+
+    def get_fingerprint(self, session_data):
+        return self.storage.get_fingerprint(session_data)
+
+    def read(self, session_key):
+        session_data = self.load(session_key)
+        return {} if session_data is None else session_data
+
+    def update(self, session_key, session_data, expiry_age):
+        self.storage.update(session_key, session_data, expiry_age)
+        self._cache_session(session_key, session_data)
+
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        self.storage.update_fields(
+            session_key, session_data, changed_keys, deleted_keys, expiry_age)
+        self._cache_session(session_key, session_data)
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        if not self.storage.compare_and_update(session_key, session_data, expiry_age, fingerprint):
+            # The cached data is stale
+            self.cache.pop(session_key)
+            return False
+
+        self._cache_session(session_key, session_data)
+        return True
+
+    def delete(self, session_key):
+        self.cache.pop(session_key)
+        return self.storage.delete(session_key)
+
+    def read_many(self, session_keys):
+        sessions = {}
+        missing_keys = []
+        for session_key in session_keys:
+            entry = None if self.validate else self.cache.get(session_key)
+            if entry is not None:
+                sessions[session_key] = copy.deepcopy(entry[1])
+            else:
+                missing_keys.append(session_key)
+
+        if missing_keys:
+            loaded = self.storage.read_many(missing_keys)
+            for session_key, session_data in loaded.items():
+                self._cache_session(session_key, session_data)
+            sessions.update(loaded)
+
+        return sessions
+
+    def update_many(self, sessions, expiry_age):
+        self.storage.update_many(sessions, expiry_age)
+        for session_key, session_data in sessions.items():
+            self._cache_session(session_key, session_data)
+
+    def delete_many(self, session_keys):
+        session_keys = list(session_keys)
+        for session_key in session_keys:
+            self.cache.pop(session_key)
+        return self.storage.delete_many(session_keys)
+
+    def touch(self, session_key, expiry_age, threshold=0):
+        return self.storage.touch(session_key, expiry_age, threshold)
+
+    def touch_many(self, session_keys, expiry_age):
+        return self.storage.touch_many(session_keys, expiry_age)
+
+    @property
+    def supports_versions(self):
+        return self.storage.supports_versions
+
+    def get_version(self, session_key):
+        return self.storage.get_version(session_key)
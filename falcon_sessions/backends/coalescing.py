@@ -0,0 +1,214 @@
+from __future__ import unicode_literals
+
+import copy
+import sys
+import threading
+
+import six
+
+from ..writer import Write
+from .base import AbstractSessionStorage
+
+
+class _Flight(object):
+
+    """Operation on a session shared by several threads."""
+
+    def __init__(self, write=None):
+        self.write = write
+        self.claimed = False
+        self.ready = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+    def run(self, func, *args):
+        try:
+            self.result = func(*args)
+        except Exception:
+            self.exc_info = sys.exc_info()
+        finally:
+            self.done.set()
+
+    def get_result(self):
+        if self.exc_info is not None:
+            six.reraise(*self.exc_info)
+        return self.result
+
+
+class CoalescingSessionStorage(AbstractSessionStorage):
+
+    """Storage that combines concurrent operations on the same session
+    within a process.
+
+    Threads that load a session while another thread is loading it wait
+    for that load and get a copy of its result. Writes of a session that
+    is being written are merged into a single write, which is executed by
+    one of the waiting threads when the current write finishes, so a
+    session is written by at most one thread at a time. Every write still
+    returns only after the data has been saved.
+
+    Changes of top-level keys written by :meth:`update_fields` are merged,
+    so concurrent requests that change different keys don't overwrite each
+    other. A whole update replaces pending changes as usual. Use
+    :meth:`compare_and_update` with ``session_optimistic_locking`` of the
+    middleware to detect changes made by other processes.
+
+    :param storage: wrapped storage
+    :type storage: AbstractSessionStorage
+    """
+
+    def __init__(self, storage):
+        super(CoalescingSessionStorage, self).__init__(
+            serializer=storage.serializer, signer=storage.signer, compressor=storage.compressor)
+        self.storage = storage
+        self.shared_load_count = 0
+        self.coalesced_count = 0
+
+        self._lock = threading.Lock()
+        self._loads = {}
+        self._writing = set()
+        self._pending = {}
+
+    def _load_once(self, func, session_key):
+        flight_key = (func.__name__, session_key)
+        with self._lock:
+            flight = self._loads.get(flight_key)
+            shared = flight is not None
+            if shared:
+                self.shared_load_count += 1
+            else:
+                flight = self._loads[flight_key] = _Flight()
+
+        if shared:
+            flight.done.wait()
+            # Every request gets its own data to modify
+            return copy.deepcopy(flight.get_result())
+
+        try:
+            flight.run(func, session_key)
+        finally:
+            with self._lock:
+                # The flight may have been detached by a write
+                if self._loads.get(flight_key) is flight:
+                    del self._loads[flight_key]
+
+        return flight.get_result()
+
+    def _write(self, session_key, write):
+        with self._lock:
+            if session_key not in self._writing:
+                self._writing.add(session_key)
+                flight = None
+            else:
+                flight = self._pending.get(session_key)
+                if flight is None:
+                    flight = self._pending[session_key] = _Flight(write)
+                else:
+                    flight.write = flight.write.merge(write)
+                    self.coalesced_count += 1
+
+        if flight is None:
+            try:
+                return write.execute(self.storage, session_key)
+            finally:
+                self._finish(session_key)
+
+        flight.ready.wait()
+        with self._lock:
+            claimed, flight.claimed = not flight.claimed, True
+
+        if claimed:
+            try:
+                flight.run(flight.write.execute, self.storage, session_key)
+            finally:
+                self._finish(session_key)
+        else:
+            flight.done.wait()
+
+        return flight.get_result()
+
+    def _detach_loads(self, session_keys):
+        # Loads started before a write may return the old data, so later
+        # loads don't join them
+        with self._lock:
+            for session_key in session_keys:
+                for method_name in ('load', 'load_with_fingerprint'):
+                    self._loads.pop((method_name, session_key), None)
+
+    def _finish(self, session_key):
+        self._detach_loads([session_key])
+        with self._lock:
+            flight = self._pending.pop(session_key, None)
+            if flight is None:
+                self._writing.discard(session_key)
+            else:
+                # Writes merged meanwhile are executed by one of their threads
+                flight.ready.set()
+
+    def exists(self, session_key):
+        return self.storage.exists(session_key)
+
+    def insert(self, session_key, session_data, expiry_age):
+        self.storage.insert(session_key, session_data, expiry_age)
+
+    def add(self, session_key, session_data, expiry_age):
+        return self.storage.add(session_key, session_data, expiry_age)
+
+    def load(self, session_key):
+        return self._load_once(self.storage.load, session_key)
+
+    def load_with_fingerprint(self, session_key):
+        return self._load_once(self.storage.load_with_fingerprint, session_key)
+
+    def read(self, session_key):
+        session_data = self.load(session_key)
+        return {} if session_data is None else session_data
+
+    def update(self, session_key, session_data, expiry_age):
+        self._write(session_key, Write(Write.UPDATE, session_data, expiry_age))
+
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        self._write(session_key, Write(
+            Write.UPDATE_FIELDS, session_data, expiry_age, changed_keys, deleted_keys))
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        try:
+            return self.storage.compare_and_update(session_key, session_data, expiry_age, fingerprint)
+        finally:
+            self._detach_loads([session_key])
+
+    def delete(self, session_key):
+        return self._write(session_key, Write(Write.DELETE))
+
+    def read_many(self, session_keys):
+        return self.storage.read_many(session_keys)
+
+    def update_many(self, sessions, expiry_age):
+        try:
+            self.storage.update_many(sessions, expiry_age)
+        finally:
+            self._detach_loads(sessions)
+
+    def delete_many(self, session_keys):
+        session_keys = list(session_keys)
+        try:
+            return self.storage.delete_many(session_keys)
+        finally:
+            self._detach_loads(session_keys)
+
+    def touch(self, session_key, expiry_age, threshold=0):
+        return self.storage.touch(session_key, expiry_age, threshold)
+
+    def touch_many(self, session_keys, expiry_age):
+        return self.storage.touch_many(session_keys, expiry_age)
+
+    @property
+    def supports_versions(self):
+        return self.storage.supports_versions
+
+    def get_version(self, session_key):
+        return self.storage.get_version(session_key)
+
+    def get_fingerprint(self, session_data):
+        return self.storage.get_fingerprint(session_data)
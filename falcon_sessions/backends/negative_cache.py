@@ -0,0 +1,139 @@
+from __future__ import unicode_literals
+
+from .base import AbstractSessionStorage
+from .cache import LocalCache
+
+
+class NegativeCacheSessionStorage(AbstractSessionStorage):
+
+    """Storage that remembers session keys missing in the wrapped storage.
+
+    Recently missed keys, like expired or forged cookies, are answered from
+    process memory for ``ttl`` seconds. Sessions are created with new
+    random keys, so a missed key rarely appears in the storage later.
+
+    :param storage: wrapped storage
+    :type storage: AbstractSessionStorage
+    :param maxsize: maximum number of remembered missing keys. Default: 10000
+    :type maxsize: int
+    :param ttl: number of seconds a missing key is remembered. Default: 60
+    :type ttl: float
+    """
+
+    def __init__(self, storage, maxsize=10000, ttl=60):
+        super(NegativeCacheSessionStorage, self).__init__(
+            serializer=storage.serializer, signer=storage.signer, compressor=storage.compressor)
+        self.storage = storage
+        self.missing_keys = LocalCache(maxsize, ttl)
+        self.hit_count = 0
+
+    def is_missing(self, session_key):
+        """Returns ``True`` if the session is known to be missing."""
+        missing = session_key in self.missing_keys
+        if missing:
+            self.hit_count += 1
+        return missing
+
+    def _set_missing(self, session_key):
+        self.missing_keys.set(session_key, True)
+
+    def _set_created(self, session_key):
+        self.missing_keys.pop(session_key)
+
+    def exists(self, session_key):
+        if self.is_missing(session_key):
+            return False
+
+        if not self.storage.exists(session_key):
+            self._set_missing(session_key)
+            return False
+
+        return True
+
+    def insert(self, session_key, session_data, expiry_age):
+        self.storage.insert(session_key, session_data, expiry_age)
+        self._set_created(session_key)
+
+    def add(self, session_key, session_data, expiry_age):
+        if not self.storage.add(session_key, session_data, expiry_age):
+            return False
+
+        self._set_created(session_key)
+        return True
+
+    def load(self, session_key):
+        if self.is_missing(session_key):
+            return None
+
+        session_data = self.storage.load(session_key)
+        if session_data is None:
+            self._set_missing(session_key)
+        return session_data
+
+    def load_with_fingerprint(self, session_key):
+        if self.is_missing(session_key):
+            return None
+
+        result = self.storage.load_with_fingerprint(session_key)
+        if result is None:
+            self._set_missing(session_key)
+        return result
+
+    def read(self, session_key):
+        if self.is_missing(session_key):
+            return {}
+
+        return self.storage.read(session_key)
+
+    def update(self, session_key, session_data, expiry_age):
+        self.missing_keys.pop(session_key)
+        self.storage.update(session_key, session_data, expiry_age)
+
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        self.missing_keys.pop(session_key)
+        self.storage.update_fields(
+            session_key, session_data, changed_keys, deleted_keys, expiry_age)
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        return self.storage.compare_and_update(session_key, session_data, expiry_age, fingerprint)
+
+    def delete(self, session_key):
+        deleted = self.storage.delete(session_key)
+        self._set_missing(session_key)
+        return deleted
+
+    def read_many(self, session_keys):
+        session_keys = [session_key for session_key in session_keys if not self.is_missing(session_key)]
+        sessions = self.storage.read_many(session_keys)
+        for session_key in session_keys:
+            if session_key not in sessions:
+                self._set_missing(session_key)
+        return sessions
+
+    def update_many(self, sessions, expiry_age):
+        for session_key in sessions:
+            self.missing_keys.pop(session_key)
+        self.storage.update_many(sessions, expiry_age)
+
+    def delete_many(self, session_keys):
+        session_keys = list(session_keys)
+        deleted = self.storage.delete_many(session_keys)
+        for session_key in session_keys:
+            self._set_missing(session_key)
+        return deleted
+
+    def touch(self, session_key, expiry_age, threshold=0):
+        return self.storage.touch(session_key, expiry_age, threshold)
+
+    def touch_many(self, session_keys, expiry_age):
+        return self.storage.touch_many(session_keys, expiry_age)
+
+    @property
+    def supports_versions(self):
+        return self.storage.supports_versions
+
+    def get_version(self, session_key):
+        return self.storage.get_version(session_key)
+
+    def get_fingerprint(self, session_data):
+        return self.storage.get_fingerprint(session_data)
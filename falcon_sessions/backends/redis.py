@@ -1,11 +1,14 @@
 from __future__ import unicode_literals, absolute_import
 
-import operator
-from collections import namedtuple
+import hashlib
+import struct
+import threading
+import time
+from bisect import bisect
+from collections import namedtuple, OrderedDict
 
 import redis
-
-from cachetools import cachedmethod, LRUCache
+from six.moves import queue
 
 from .base import AbstractSessionStorage, CorruptedSessionDataError
 
@@ -15,9 +18,49 @@ class AbstractRedisServer(object):
     def connect(self, session_key):
         raise NotImplementedError
 
+    def get_server(self, session_key):
+        """Returns the server that stores the given session key."""
+        return self
+
+    def get_servers(self):
+        """Returns all servers that store sessions."""
+        return [self]
+
+    def disconnect(self):
+        """Closes all connections opened by the server."""
+        pass
+
 
 class RedisServer(AbstractRedisServer):
 
+    """Redis server.
+
+    The server owns a single connection pool that is created on the first
+    call of :meth:`connect` and is shared by all storage operations. The
+    pool is thread-safe and is reset automatically in a forked child
+    process, so it is safe to create the server before the fork.
+
+    :param max_connections: maximum number of connections in the pool.
+        Default: unlimited
+    :type max_connections: int
+    :param socket_connect_timeout: timeout of establishing a new connection.
+        Default: ``socket_timeout``
+    :type socket_connect_timeout: float
+    :param socket_keepalive: whether to enable TCP keepalive. Default: False
+    :type socket_keepalive: bool
+    :param health_check_interval: idle connections are checked with PING
+        before use if they have been idle for this number of seconds.
+        Default: 0 (disabled)
+    :type health_check_interval: int
+    :param name: name of the server in :class:`RedisPool`. Default: the URL,
+        the socket path or ``host:port/db``
+    :type name: basestring
+    """
+
+    client_class = redis.StrictRedis
+    connection_pool_class = redis.ConnectionPool
+    unix_domain_socket_connection_class = redis.UnixDomainSocketConnection
+
     def __init__(self,
                  host='localhost',
                  port=6379,
@@ -26,7 +69,12 @@ class RedisServer(AbstractRedisServer):
                  db=0,
                  password=None,
                  socket_timeout=0.1,
-                 retry_on_timeout=False):
+                 retry_on_timeout=False,
+                 max_connections=None,
+                 socket_connect_timeout=None,
+                 socket_keepalive=False,
+                 health_check_interval=0,
+                 name=None):
         self.host = host
         self.port = port
         self.url = url
@@ -35,59 +83,260 @@ class RedisServer(AbstractRedisServer):
         self.password = password
         self.socket_timeout = socket_timeout
         self.retry_on_timeout = retry_on_timeout
+        self.max_connections = max_connections
+        self.socket_connect_timeout = socket_connect_timeout
+        self.socket_keepalive = socket_keepalive
+        self.health_check_interval = health_check_interval
+        self.name = name or self.get_default_name()
+        self._lock = threading.Lock()
+        self._connection_pool = None
+        self._client = None
+
+    def get_default_name(self):
+        if self.url is not None:
+            return self.url
+
+        elif self.unix_domain_socket_path is not None:
+            return '{}/{}'.format(self.unix_domain_socket_path, self.db)
+
+        return '{}:{}/{}'.format(self.host, self.port, self.db)
+
+    def get_connection_kwargs(self):
+        """Returns keyword arguments of connections in the pool."""
+        kwargs = {
+            'socket_timeout': self.socket_timeout,
+            'retry_on_timeout': self.retry_on_timeout,
+        }
+
+        if self.socket_connect_timeout is not None:
+            kwargs['socket_connect_timeout'] = self.socket_connect_timeout
+
+        if self.health_check_interval:
+            kwargs['health_check_interval'] = self.health_check_interval
+
+        return kwargs
+
+    def create_connection_pool(self):
+        kwargs = self.get_connection_kwargs()
 
-    def connect(self, session_key):
         if self.url is not None:
-            return redis.StrictRedis.from_url(
+            return self.connection_pool_class.from_url(
                 self.url,
-                socket_timeout=self.socket_timeout
+                max_connections=self.max_connections,
+                **kwargs
             )
 
         elif self.unix_domain_socket_path is not None:
-            return redis.StrictRedis(
-                unix_socket_path=self.unix_domain_socket_path,
-                socket_timeout=self.socket_timeout,
-                retry_on_timeout=self.retry_on_timeout,
+            return self.connection_pool_class(
+                connection_class=self.unix_domain_socket_connection_class,
+                path=self.unix_domain_socket_path,
                 db=self.db,
                 password=self.password,
+                max_connections=self.max_connections,
+                **kwargs
             )
 
         else:
-            return redis.StrictRedis(
+            return self.connection_pool_class(
                 host=self.host,
                 port=self.port,
-                socket_timeout=self.socket_timeout,
-                retry_on_timeout=self.retry_on_timeout,
                 db=self.db,
-                password=self.password
+                password=self.password,
+                socket_keepalive=self.socket_keepalive,
+                max_connections=self.max_connections,
+                **kwargs
             )
 
+    def connect(self, session_key):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._connection_pool = self.create_connection_pool()
+                    self._client = self.client_class(
+                        connection_pool=self._connection_pool)
+
+        return self._client
+
+    def disconnect(self):
+        with self._lock:
+            if self._connection_pool is not None:
+                self._connection_pool.disconnect()
+            self._connection_pool = None
+            self._client = None
+
+
+class SentinelMasterClient(redis.StrictRedis):
+
+    """Client of the master discovered by :class:`RedisSentinel`.
+
+    Connection errors and ``READONLY`` replies are reported to the server,
+    which re-discovers the master. If the master has changed the command
+    is retried once on the new master.
+    """
+
+    def __init__(self, server, **kwargs):
+        super(SentinelMasterClient, self).__init__(**kwargs)
+        self.server = server
+
+    def execute_command(self, *args, **options):
+        try:
+            return super(SentinelMasterClient, self).execute_command(*args, **options)
+        except redis.ConnectionError:
+            if not self.server.handle_failover(self):
+                raise
+        except redis.ResponseError as e:
+            if not str(e).startswith('READONLY') or not self.server.handle_failover(self):
+                raise
+
+        return self.server.connect(None).execute_command(*args, **options)
+
 
 class RedisSentinel(AbstractRedisServer):
 
+    """Redis server discovered by Redis Sentinel.
+
+    The master address is discovered once and cached. It is refreshed only
+    when a command fails with a connection error or a ``READONLY`` reply,
+    or when ``sentinel_refresh_interval`` has elapsed since the last
+    discovery, so sentinels are not queried on every storage operation.
+
+    :param max_connections: maximum number of connections to the master.
+        Default: unlimited
+    :type max_connections: int
+    :param health_check_interval: idle connections are checked with PING
+        before use if they have been idle for this number of seconds.
+        Default: 0 (disabled)
+    :type health_check_interval: int
+    :param sentinel_refresh_interval: number of seconds after which the
+        master address is re-discovered. Default: None (only on failures)
+    :type sentinel_refresh_interval: int
+    :param name: name of the server in :class:`RedisPool`. Default:
+        ``sentinel_master_alias/db``
+    :type name: basestring
+    """
+
     def __init__(self,
                  sentinels,
                  sentinel_master_alias,
                  db=0,
                  password=None,
                  socket_timeout=0.1,
-                 retry_on_timeout=False):
+                 retry_on_timeout=False,
+                 max_connections=None,
+                 health_check_interval=0,
+                 sentinel_refresh_interval=None,
+                 name=None):
         self.sentinels = sentinels
         self.sentinel_master_alias = sentinel_master_alias
         self.db = db
         self.password = password
         self.socket_timeout = socket_timeout
         self.retry_on_timeout = retry_on_timeout
+        self.max_connections = max_connections
+        self.health_check_interval = health_check_interval
+        self.sentinel_refresh_interval = sentinel_refresh_interval
+        self.name = name or '{}/{}'.format(sentinel_master_alias, db)
+        self.master_address = None
+        self.discovery_count = 0
+        self.failover_count = 0
+        self._lock = threading.Lock()
+        self._sentinel = None
+        self._client = None
+        self._discovered_at = None
+
+    def get_connection_kwargs(self):
+        """Returns keyword arguments of connections to the master."""
+        kwargs = {
+            'socket_timeout': self.socket_timeout,
+            'retry_on_timeout': self.retry_on_timeout,
+            'db': self.db,
+            'password': self.password,
+        }
+
+        if self.health_check_interval:
+            kwargs['health_check_interval'] = self.health_check_interval
+
+        return kwargs
+
+    def get_sentinel(self):
+        if self._sentinel is None:
+            from redis.sentinel import Sentinel  # noqa
+            self._sentinel = Sentinel(
+                self.sentinels,
+                sentinel_kwargs={'socket_timeout': self.socket_timeout}
+            )
+
+        return self._sentinel
+
+    def _refresh(self):
+        address = self.get_sentinel().discover_master(self.sentinel_master_alias)
+        self.discovery_count += 1
+        self._discovered_at = time.time()
+
+        if address == self.master_address and self._client is not None:
+            return False
+
+        if self.master_address is not None:
+            self.failover_count += 1
+
+        old_client = self._client
+        self.master_address = address
+        self._client = SentinelMasterClient(
+            self,
+            connection_pool=redis.ConnectionPool(
+                host=address[0],
+                port=address[1],
+                max_connections=self.max_connections,
+                **self.get_connection_kwargs()
+            )
+        )
+
+        if old_client is not None:
+            old_client.connection_pool.disconnect()
+
+        return True
+
+    def _is_refresh_needed(self):
+        if self._client is None:
+            return True
+
+        if self.sentinel_refresh_interval is None:
+            return False
+
+        return time.time() - self._discovered_at >= self.sentinel_refresh_interval
 
     def connect(self, session_key):
-        from redis.sentinel import Sentinel  # noqa
-        return Sentinel(
-            self.sentinels,
-            socket_timeout=self.socket_timeout,
-            retry_on_timeout=self.retry_on_timeout,
-            db=self.db,
-            password=self.password
-        ).master_for(self.sentinel_master_alias)
+        if self._is_refresh_needed():
+            with self._lock:
+                if self._is_refresh_needed():
+                    try:
+                        self._refresh()
+                    except redis.ConnectionError:
+                        # Keep using the known master if sentinels are unavailable
+                        if self._client is None:
+                            raise
+                        self._discovered_at = time.time()
+
+        return self._client
+
+    def handle_failover(self, client):
+        """Re-discovers the master after a failure of the given client.
+
+        Returns ``True`` if the command should be retried on a new master.
+        """
+        with self._lock:
+            if client is not self._client:
+                # Another thread has already switched to a new master
+                return self._client is not None
+
+            return self._refresh()
+
+    def disconnect(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.connection_pool.disconnect()
+            self._client = None
+            self.master_address = None
 
 
 WeighedServer = namedtuple(
@@ -96,49 +345,142 @@ WeighedServer = namedtuple(
 )
 
 
+def is_busy_key_error(error):
+    """Returns ``True`` if RESTORE has failed because the key exists."""
+    return str(error).startswith('BUSYKEY')
+
+
 class RedisPoolUnableGetServerError(Exception):
     pass
 
 
+def _hash(value):
+    return hashlib.md5(value.encode('utf-8')).digest()
+
+
+class HashRing(object):
+
+    """Weighted consistent hash ring (ketama).
+
+    Every node gets ``replicas * 4`` points on the ring per unit of weight,
+    so adding or removing a node remaps only the keys that belong to it.
+
+    :param nodes: iterable of ``(name, weight, node)``
+    :type nodes: collections.Iterable
+    :param replicas: number of hashes per unit of weight
+    :type replicas: int
+    """
+
+    def __init__(self, nodes, replicas=40):
+        points = []
+        for name, weight, node in nodes:
+            for i in range(weight * replicas):
+                digest = _hash('{}-{}'.format(name, i))
+                for offset in range(0, 16, 4):
+                    points.append((struct.unpack_from('<I', digest, offset)[0], name, node))
+
+        points.sort(key=lambda point: point[:2])
+        self._points = [point[0] for point in points]
+        self._nodes = [point[2] for point in points]
+
+    def __len__(self):
+        return len(self._points)
+
+    def get_node(self, key):
+        """Returns the node the key belongs to or ``None`` if the ring is empty."""
+        if not self._points:
+            return None
+
+        point = struct.unpack_from('<I', _hash(key))[0]
+        return self._nodes[bisect(self._points, point) % len(self._points)]
+
+
 class RedisPool(AbstractRedisServer):
 
+    """Pool of Redis servers sharded by session key.
+
+    Session keys are distributed between servers with a weighted
+    consistent hash ring built from server names.
+
+    :param args: weighted servers
+    :type args: WeighedServer
+    """
+
     def __init__(self, *args):
         self.weighted_servers = args
-        self.cache = LRUCache(1024)
 
-    @cachedmethod(operator.attrgetter('cache'))
+        names = [weighted_server.server.name for weighted_server in args]
+        if len(set(names)) != len(names):
+            raise ValueError("Names of servers in the pool must be unique")
+
+        self.ring = HashRing(
+            (weighted_server.server.name, weighted_server.weight, weighted_server.server)
+            for weighted_server in args
+        )
+
     def _get_server(self, session_key):
-        total_weight = sum([connection.weight for connection in self.weighted_servers])
-        pos = 0
-        for i in range(3, -1, -1):
-            pos = pos * 2 ** 8 + ord(session_key[i])
-        pos = pos % total_weight
-
-        pool = iter(self.weighted_servers)
-        weighted_server = next(pool)
-        i = 0
-        while i < total_weight:
-            if i <= pos < (i + weighted_server.weight):
-                return weighted_server.server
-            i += weighted_server.weight
-            weighted_server = next(pool)
+        return self.ring.get_node(session_key)
 
-    def connect(self, session_key):
+    def get_server(self, session_key):
         server = self._get_server(session_key)
 
         if server is None:
             raise RedisPoolUnableGetServerError(
                 "Unable to get a server for the session key '{}'".format(session_key))
 
-        return server.connect(session_key)
+        return server
 
+    def get_servers(self):
+        return [weighted_server.server for weighted_server in self.weighted_servers]
 
-class RedisSessionStorage(AbstractSessionStorage):
+    def connect(self, session_key):
+        return self.get_server(session_key).connect(session_key)
 
-    def __init__(self, server, prefix='', **kwargs):
-        super(RedisSessionStorage, self).__init__(**kwargs)
-        self.server = server
-        self.prefix = prefix
+    def disconnect(self):
+        for weighted_server in self.weighted_servers:
+            weighted_server.server.disconnect()
+
+
+# Refreshes the expiry only if the remaining TTL is at most ARGV[2] seconds
+TOUCH_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl == -2 then
+    return 0
+end
+if ttl > tonumber(ARGV[2]) then
+    return 1
+end
+return redis.call('EXPIRE', KEYS[1], ARGV[1])
+"""
+
+
+# Adds ARGV[2:] to the set and extends its expiry to at least ARGV[1]
+INDEX_SCRIPT = """
+redis.call('SADD', KEYS[1], unpack(ARGV, 2))
+if redis.call('TTL', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+# Sets the key to ARGV[3] with expiry ARGV[2] if the sha1 of its value is
+# ARGV[1]
+COMPARE_AND_UPDATE_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value or redis.sha1hex(value) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2])
+return 1
+"""
+
+
+class RedisKeysMixin(object):
+
+    """Mapping of session keys to prefixed key names in Redis."""
+
+    prefix = ''
 
     def get_real_stored_key(self, session_key):
         """Returns the real key name in server storage."""
@@ -147,23 +489,168 @@ class RedisSessionStorage(AbstractSessionStorage):
 
         return ':'.join((self.prefix, session_key))
 
+    def get_session_key(self, real_stored_key):
+        """Returns the session key of the real key name in server storage."""
+        if isinstance(real_stored_key, bytes):
+            real_stored_key = real_stored_key.decode('utf-8')
+
+        if not self.prefix:
+            return real_stored_key
+
+        return real_stored_key[len(self.prefix) + 1:]
+
+
+class RedisSessionStorage(RedisKeysMixin, AbstractSessionStorage):
+
+    """Session storage in Redis.
+
+    :param server: server that provides connections for session keys
+    :type server: AbstractRedisServer
+    :param prefix: prefix of keys in Redis
+    :type prefix: basestring
+    :param previous_server: server with the previous topology while sessions
+        are being migrated. Sessions missing on ``server`` are looked up
+        there and moved to ``server``
+    :type previous_server: AbstractRedisServer
+    :param user_index_field: session data field with the user ID. If it's
+        given, the keys of sessions of every user are kept in a set, and
+        :meth:`get_user_session_keys` and :meth:`delete_user_sessions` can
+        be used. Default: None (no index)
+    :type user_index_field: basestring
+
+    The index is updated whenever a session is written and pruned of
+    deleted and reassigned sessions when it is read. It expires with the
+    last session of the user, so the expiry of indexed sessions is never
+    refreshed without writing the session.
+    """
+
+    # Maximum number of sessions in a single command or pipeline of
+    # operations on many sessions
+    batch_size = 1000
+
+    supports_versions = True
+
+    def __init__(self, server, prefix='', previous_server=None, user_index_field=None, **kwargs):
+        super(RedisSessionStorage, self).__init__(**kwargs)
+        self.server = server
+        self.prefix = prefix
+        self.previous_server = previous_server
+        self.user_index_field = user_index_field
+        self._touch_script = None
+        self._index_script = None
+        self._compare_and_update_script = None
+
     def exists(self, session_key):
         connection = self.server.connect(session_key)
-        return connection.exists(self.get_real_stored_key(session_key))
+        if connection.exists(self.get_real_stored_key(session_key)):
+            return True
+
+        if self.previous_server is not None:
+            connection = self.previous_server.connect(session_key)
+            return bool(connection.exists(self.get_real_stored_key(session_key)))
+
+        return False
+
+    def _move_from_previous_server(self, session_key):
+        """Moves the session from the server of the previous topology.
+
+        Returns ``True`` if the session has been found there.
+        """
+        previous_server = self.previous_server.get_server(session_key)
+        server = self.server.get_server(session_key)
+        if previous_server.name == server.name:
+            return False
+
+        real_stored_key = self.get_real_stored_key(session_key)
+        previous_connection = previous_server.connect(session_key)
+        pipeline = previous_connection.pipeline(transaction=False)
+        pipeline.dump(real_stored_key)
+        pipeline.pttl(real_stored_key)
+        value, ttl = pipeline.execute()
+        if value is None:
+            return False
+
+        try:
+            server.connect(session_key).restore(real_stored_key, ttl if ttl > 0 else 0, value)
+        except redis.ResponseError as e:
+            # The session may have been already moved by another process,
+            # otherwise the previous copy is kept
+            if not is_busy_key_error(e):
+                raise
+
+        previous_connection.delete(real_stored_key)
+        return True
 
     def insert(self, session_key, session_data, expiry_age):
         self.update(session_key, session_data, expiry_age)
 
-    def read(self, session_key, **kwargs):
+    def add(self, session_key, session_data, expiry_age):
         connection = self.server.connect(session_key)
+        added = bool(connection.set(
+            self.get_real_stored_key(session_key),
+            self.encode(session_data),
+            ex=expiry_age,
+            nx=True
+        ))
+        if added:
+            self._index_sessions({session_key: session_data}, expiry_age)
+        return added
+
+    def get_encoded(self, session_key):
+        """Returns encoded session data or ``None`` if there is no session."""
+        connection = self.server.connect(session_key)
+        real_stored_key = self.get_real_stored_key(session_key)
+        session_data = self._get(connection, real_stored_key)
+        if session_data is None and self.previous_server is not None:
+            if self._move_from_previous_server(session_key):
+                session_data = self._get(connection, real_stored_key)
+
+        return session_data
+
+    def _get(self, connection, real_stored_key):
+        return connection.get(real_stored_key)
+
+    def _decode_stored(self, session_data):
+        return self.decode(session_data)
+
+    def decode_stored(self, session_data):
+        """Returns session data decoded from the data returned by
+        :meth:`get_encoded`, or an empty dict if it can't be deserialized.
+        """
+        try:
+            return self._decode_stored(session_data)
+        except CorruptedSessionDataError:
+            raise
+        except Exception:
+            return {}
+
+    def load(self, session_key):
+        session_data = self.get_encoded(session_key)
+        if session_data is None:
+            return None
+
+        return self.decode_stored(session_data)
+
+    def load_with_fingerprint(self, session_key):
+        session_data = self.get_encoded(session_key)
+        if session_data is None:
+            return None
+
+        return self.decode_stored(session_data), self.get_encoded_fingerprint(session_data)
+
+    def read(self, session_key, **kwargs):
         try:
-            return self.decode(
-                connection.get(self.get_real_stored_key(session_key)))
+            session_data = self.load(session_key)
         except CorruptedSessionDataError:
             raise
         except Exception:
             return {}
 
+        return {} if session_data is None else session_data
+
+    def _pipeline_update(self, pipeline, session_key, session_data, expiry_age):
+        pipeline.setex(self.get_real_stored_key(session_key), expiry_age, self.encode(session_data))
+
     def update(self, session_key, session_data, expiry_age):
         connection = self.server.connect(session_key)
         if redis.VERSION[0] >= 2:
@@ -182,9 +669,323 @@ class RedisSessionStorage(AbstractSessionStorage):
                 expiry_age
             )
 
+        self._index_sessions({session_key: session_data}, expiry_age)
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        connection = self.server.connect(session_key)
+        if self._compare_and_update_script is None:
+            self._compare_and_update_script = connection.register_script(COMPARE_AND_UPDATE_SCRIPT)
+
+        updated = bool(self._compare_and_update_script(
+            keys=[self.get_real_stored_key(session_key)],
+            args=[fingerprint, expiry_age, self.encode(session_data)],
+            client=connection
+        ))
+        if updated:
+            self._index_sessions({session_key: session_data}, expiry_age)
+        return updated
+
     def delete(self, session_key):
         connection = self.server.connect(session_key)
         try:
+            if self.previous_server is not None:
+                self.previous_server.connect(session_key).delete(
+                    self.get_real_stored_key(session_key))
+
             return connection.delete(self.get_real_stored_key(session_key))
         except Exception:
             pass
+
+    def _iter_batches(self, session_keys, server=None):
+        """Yields connections and batches of session keys stored on them."""
+        server = server or self.server
+        groups = OrderedDict()
+        for session_key in session_keys:
+            concrete_server = server.get_server(session_key)
+            groups.setdefault(concrete_server.name, (concrete_server, []))[1].append(session_key)
+
+        for concrete_server, group in groups.values():
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                yield concrete_server.connect(batch[0]), batch
+
+    def _get_many(self, connection, real_stored_keys):
+        return connection.mget(real_stored_keys)
+
+    def read_many(self, session_keys):
+        sessions = {}
+        for connection, batch in self._iter_batches(session_keys):
+            values = self._get_many(connection, [self.get_real_stored_key(key) for key in batch])
+            for session_key, session_data in zip(batch, values):
+                if session_data is not None:
+                    sessions[session_key] = self.decode_stored(session_data)
+                elif self.previous_server is not None:
+                    session_data = self.load(session_key)
+                    if session_data is not None:
+                        sessions[session_key] = session_data
+
+        return sessions
+
+    def update_many(self, sessions, expiry_age):
+        for connection, batch in self._iter_batches(sessions):
+            pipeline = connection.pipeline()
+            for session_key in batch:
+                self._pipeline_update(pipeline, session_key, sessions[session_key], expiry_age)
+            pipeline.execute()
+
+        self._index_sessions(sessions, expiry_age)
+
+    def delete_many(self, session_keys):
+        """Deletes sessions. Returns the number of deleted sessions."""
+        session_keys = list(session_keys)
+        if self.previous_server is not None:
+            for connection, batch in self._iter_batches(session_keys, self.previous_server):
+                connection.delete(*[self.get_real_stored_key(key) for key in batch])
+
+        deleted = 0
+        for connection, batch in self._iter_batches(session_keys):
+            deleted += connection.delete(*[self.get_real_stored_key(key) for key in batch])
+        return deleted
+
+    def touch_many(self, session_keys, expiry_age):
+        if self.user_index_field is not None:
+            # Sessions are written instead, so the user index expires after them
+            sessions = self.read_many(session_keys)
+            self.update_many(sessions, expiry_age)
+            return list(sessions)
+
+        touched = []
+        for connection, batch in self._iter_batches(session_keys):
+            pipeline = connection.pipeline(transaction=False)
+            for session_key in batch:
+                pipeline.expire(self.get_real_stored_key(session_key), expiry_age)
+            touched.extend(key for key, exists in zip(batch, pipeline.execute()) if exists)
+        return touched
+
+    def get_servers(self):
+        """Returns distinct servers of the current and the previous topology."""
+        servers = OrderedDict()
+        for topology in (self.server, self.previous_server):
+            if topology is not None:
+                for server in topology.get_servers():
+                    servers.setdefault(server.name, server)
+        return list(servers.values())
+
+    def _pipeline_get(self, pipeline, real_stored_key):
+        pipeline.get(real_stored_key)
+
+    def _fetch(self, connection, real_stored_keys):
+        pipeline = connection.pipeline(transaction=False)
+        for real_stored_key in real_stored_keys:
+            self._pipeline_get(pipeline, real_stored_key)
+            pipeline.ttl(real_stored_key)
+        # Keys of other types fail with WRONGTYPE and are skipped
+        values = pipeline.execute(raise_on_error=False)
+        return [
+            (real_stored_key, session_data, ttl)
+            for real_stored_key, session_data, ttl in zip(real_stored_keys, values[::2], values[1::2])
+            if session_data and not isinstance(session_data, redis.ResponseError)
+        ]
+
+    def _put(self, batches, item, stopped):
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _scan_server(self, server, batch_size, batches, stopped):
+        try:
+            connection = server.connect(None)
+            real_stored_keys = []
+            for real_stored_key in connection.scan_iter(match=self.get_real_stored_key('*'), count=batch_size):
+                if ':' in self.get_session_key(real_stored_key):
+                    # User indexes
+                    continue
+
+                real_stored_keys.append(real_stored_key)
+                if len(real_stored_keys) >= batch_size:
+                    if not self._put(batches, self._fetch(connection, real_stored_keys), stopped):
+                        return
+                    real_stored_keys = []
+
+            if real_stored_keys and not self._put(batches, self._fetch(connection, real_stored_keys), stopped):
+                return
+        except Exception as e:
+            self._put(batches, e, stopped)
+        else:
+            self._put(batches, None, stopped)
+
+    def scan(self, batch_size=None, queue_size=4):
+        """Returns an iterator of ``(session_key, session_data, ttl)`` of all
+        sessions.
+
+        Servers are scanned in parallel threads, and sessions are fetched in
+        pipelines of ``batch_size`` keys. At most ``queue_size`` fetched
+        batches wait to be decoded, so memory use doesn't depend on the
+        number of sessions. Values that can't be decoded, like corrupted
+        sessions or keys of other applications, are skipped. Like SCAN, it
+        may yield a session more than once and miss sessions written while
+        scanning.
+
+        Requires a prefix, since keys can't be told apart from keys of other
+        applications otherwise.
+
+        :param batch_size: number of keys per SCAN call and per pipeline.
+            Default: ``batch_size`` of the storage
+        :type batch_size: int
+        :param queue_size: maximum number of fetched batches. Default: 4
+        :type queue_size: int
+        """
+        if not self.prefix:
+            raise ValueError('Scanning sessions requires a storage with a prefix')
+
+        return self._scan(batch_size or self.batch_size, queue_size)
+
+    def _scan(self, batch_size, queue_size):
+        batches = queue.Queue(queue_size)
+        stopped = threading.Event()
+        threads = []
+        for server in self.get_servers():
+            thread = threading.Thread(
+                target=self._scan_server,
+                args=(server, batch_size, batches, stopped),
+                name='falcon-sessions-scan-{}'.format(server.name)
+            )
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            running = len(threads)
+            while running:
+                batch = batches.get()
+                if batch is None:
+                    running -= 1
+                    continue
+
+                if isinstance(batch, Exception):
+                    raise batch
+
+                for real_stored_key, session_data, ttl in batch:
+                    try:
+                        session_data = self._decode_stored(session_data)
+                    except Exception:
+                        continue
+                    yield self.get_session_key(real_stored_key), session_data, ttl
+        finally:
+            stopped.set()
+
+    def get_version_length(self):
+        """Returns length of the encoded data prefix that contains the signature."""
+        if self.legacy_encoding:
+            return 64
+
+        return 1 + self.signer.digest_size
+
+    def get_version(self, session_key):
+        # Encoded data starts with the signature of the serialized data
+        connection = self.server.connect(session_key)
+        version = connection.getrange(
+            self.get_real_stored_key(session_key), 0, self.get_version_length() - 1)
+        return version or None
+
+    def get_user_index_key(self, user_id):
+        """Returns the key of the index of user sessions, without prefix.
+        It can't clash with session keys, since they don't contain colons.
+        """
+        return 'user:{}'.format(user_id)
+
+    def _index_sessions(self, sessions, expiry_age):
+        if self.user_index_field is None:
+            return
+
+        indexes = OrderedDict()
+        for session_key, session_data in sessions.items():
+            user_id = session_data.get(self.user_index_field)
+            if user_id is not None:
+                indexes.setdefault(self.get_user_index_key(user_id), []).append(session_key)
+
+        for connection, batch in self._iter_batches(indexes):
+            if self._index_script is None:
+                self._index_script = connection.register_script(INDEX_SCRIPT)
+
+            pipeline = connection.pipeline(transaction=False)
+            for index_key in batch:
+                self._index_script(
+                    keys=[self.get_real_stored_key(index_key)],
+                    args=[expiry_age] + indexes[index_key],
+                    client=pipeline
+                )
+            pipeline.execute()
+
+    def get_user_session_keys(self, user_id):
+        """Returns keys of existing sessions of the user.
+
+        Requires ``user_index_field``.
+        """
+        index_key = self.get_user_index_key(user_id)
+        real_stored_key = self.get_real_stored_key(index_key)
+        connection = self.server.connect(index_key)
+        session_keys = [
+            member.decode('utf-8') if isinstance(member, bytes) else member
+            for member in connection.smembers(real_stored_key)
+        ]
+
+        # IDs are compared as they are formatted in index keys, since IDs
+        # of other types, like '5' for 5, share the index
+        sessions = self.read_many(session_keys)
+        user_session_keys = [
+            session_key for session_key, session_data in sessions.items()
+            if session_data.get(self.user_index_field) is not None and
+            self.get_user_index_key(session_data[self.user_index_field]) == index_key
+        ]
+
+        stale_session_keys = set(session_keys).difference(user_session_keys)
+        if stale_session_keys:
+            connection.srem(real_stored_key, *stale_session_keys)
+
+        return user_session_keys
+
+    def delete_user_sessions(self, user_id):
+        """Deletes all sessions of the user. Returns the number of deleted
+        sessions.
+
+        Requires ``user_index_field``.
+        """
+        session_keys = self.get_user_session_keys(user_id)
+        if not session_keys:
+            return 0
+
+        deleted = self.delete_many(session_keys)
+        index_key = self.get_user_index_key(user_id)
+        self.server.connect(index_key).srem(self.get_real_stored_key(index_key), *session_keys)
+        return deleted
+
+    def touch(self, session_key, expiry_age, threshold=0):
+        if self.user_index_field is not None:
+            # Sessions are written instead, so the user index expires after them
+            return self._touch_indexed(session_key, expiry_age, threshold)
+
+        connection = self.server.connect(session_key)
+        if not threshold:
+            return bool(connection.expire(
+                self.get_real_stored_key(session_key), expiry_age))
+
+        if self._touch_script is None:
+            self._touch_script = connection.register_script(TOUCH_SCRIPT)
+
+        return bool(self._touch_script(
+            keys=[self.get_real_stored_key(session_key)],
+            args=[expiry_age, int(expiry_age * (1 - threshold))],
+            client=connection
+        ))
+
+    def _touch_indexed(self, session_key, expiry_age, threshold):
+        if not threshold:
+            return False
+
+        ttl = self.server.connect(session_key).ttl(self.get_real_stored_key(session_key))
+        return ttl > int(expiry_age * (1 - threshold))
@@ -0,0 +1,128 @@
+from __future__ import unicode_literals, absolute_import
+
+import redis.asyncio
+
+from .base import CorruptedSessionDataError
+from .base_async import AbstractAsyncSessionStorage
+from .redis import RedisKeysMixin, RedisPool, RedisServer, TOUCH_SCRIPT
+
+
+class AsyncRedisServer(RedisServer):
+
+    """Redis server for asyncio applications.
+
+    Accepts the same parameters as :class:`RedisServer`, but :meth:`connect`
+    returns a ``redis.asyncio`` client. Servers can be combined with
+    :class:`AsyncRedisPool` the same way as synchronous ones.
+    """
+
+    client_class = redis.asyncio.StrictRedis
+    connection_pool_class = redis.asyncio.ConnectionPool
+    unix_domain_socket_connection_class = redis.asyncio.UnixDomainSocketConnection
+
+    async def disconnect(self):
+        with self._lock:
+            connection_pool = self._connection_pool
+            self._connection_pool = None
+            self._client = None
+
+        if connection_pool is not None:
+            await connection_pool.disconnect()
+
+
+class AsyncRedisPool(RedisPool):
+
+    """Pool of :class:`AsyncRedisServer` sharded like :class:`RedisPool`."""
+
+    async def disconnect(self):
+        for weighted_server in self.weighted_servers:
+            await weighted_server.server.disconnect()
+
+
+class AsyncRedisSessionStorage(RedisKeysMixin, AbstractAsyncSessionStorage):
+
+    """Session storage in Redis for asyncio applications.
+
+    Data is encoded the same way as in :class:`RedisSessionStorage`, so both
+    storages can share sessions.
+
+    :param server: server that provides asyncio connections for session keys
+    :type server: AsyncRedisServer | AsyncRedisPool
+    :param prefix: prefix of keys in Redis
+    :type prefix: basestring
+    """
+
+    def __init__(self, server, prefix='', **kwargs):
+        super(AsyncRedisSessionStorage, self).__init__(**kwargs)
+        self.server = server
+        self.prefix = prefix
+        self._touch_script = None
+
+    async def exists(self, session_key):
+        connection = self.server.connect(session_key)
+        return bool(await connection.exists(self.get_real_stored_key(session_key)))
+
+    async def insert(self, session_key, session_data, expiry_age):
+        await self.update(session_key, session_data, expiry_age)
+
+    async def add(self, session_key, session_data, expiry_age):
+        connection = self.server.connect(session_key)
+        return bool(await connection.set(
+            self.get_real_stored_key(session_key),
+            self.encode(session_data),
+            ex=expiry_age,
+            nx=True
+        ))
+
+    async def load(self, session_key):
+        connection = self.server.connect(session_key)
+        session_data = await connection.get(self.get_real_stored_key(session_key))
+        if session_data is None:
+            return None
+
+        try:
+            return self.decode(session_data)
+        except CorruptedSessionDataError:
+            raise
+        except Exception:
+            return {}
+
+    async def read(self, session_key):
+        try:
+            session_data = await self.load(session_key)
+        except CorruptedSessionDataError:
+            raise
+        except Exception:
+            return {}
+
+        return {} if session_data is None else session_data
+
+    async def update(self, session_key, session_data, expiry_age):
+        connection = self.server.connect(session_key)
+        await connection.setex(
+            self.get_real_stored_key(session_key),
+            expiry_age,
+            self.encode(session_data)
+        )
+
+    async def delete(self, session_key):
+        connection = self.server.connect(session_key)
+        try:
+            return await connection.delete(self.get_real_stored_key(session_key))
+        except Exception:
+            pass
+
+    async def touch(self, session_key, expiry_age, threshold=0):
+        connection = self.server.connect(session_key)
+        if not threshold:
+            return bool(await connection.expire(
+                self.get_real_stored_key(session_key), expiry_age))
+
+        if self._touch_script is None:
+            self._touch_script = connection.register_script(TOUCH_SCRIPT)
+
+        return bool(await self._touch_script(
+            keys=[self.get_real_stored_key(session_key)],
+            args=[expiry_age, int(expiry_age * (1 - threshold))],
+            client=connection
+        ))
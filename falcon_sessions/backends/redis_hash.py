@@ -0,0 +1,177 @@
+from __future__ import unicode_literals, absolute_import
+
+import hashlib
+
+import redis
+import six
+
+from .redis import RedisSessionStorage
+
+# Inserts fields (ARGV[2:]) with expiry ARGV[1] if the hash doesn't exist
+ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Sets ARGV[2] field-value pairs and deletes the remaining fields of an
+# existing hash, then sets expiry ARGV[1]
+UPDATE_FIELDS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local pairs_end = 2 + tonumber(ARGV[2]) * 2
+if pairs_end > 2 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 3, pairs_end))
+end
+if #ARGV > pairs_end then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, pairs_end + 1))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class RedisHashSessionStorage(RedisSessionStorage):
+
+    """Session storage in Redis hashes.
+
+    Every top-level key of the session data is stored in its own field of
+    the hash and is encoded separately, so :meth:`update_fields` sends and
+    serializes only the changed keys. Requires Redis 4 or later.
+
+    Accepts the same parameters as :class:`RedisSessionStorage`. Versions
+    of sessions aren't supported.
+    """
+
+    supports_versions = False
+
+    def __init__(self, server, prefix='', **kwargs):
+        super(RedisHashSessionStorage, self).__init__(server, prefix=prefix, **kwargs)
+        self._add_script = None
+        self._update_fields_script = None
+
+    def encode_fields(self, session_data, keys=None):
+        """Returns flat list of field names and encoded values."""
+        fields = []
+        for key in session_data if keys is None else keys:
+            fields.append(key)
+            fields.append(self.encode(session_data[key]))
+        return fields
+
+    def decode_fields(self, fields):
+        """Returns session data decoded from the hash fields."""
+        session_data = {}
+        for key, value in fields.items():
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            session_data[key] = self.decode(value)
+        return session_data
+
+    def get_fingerprint(self, session_data):
+        fields = self.encode_fields(session_data)
+        return self.get_encoded_fingerprint(dict(zip(fields[::2], fields[1::2])))
+
+    def get_encoded_fingerprint(self, fields):
+        digest = hashlib.sha1()
+        fields = dict(
+            (key.encode('utf-8') if isinstance(key, six.text_type) else key,
+             value.encode('ascii') if isinstance(value, six.text_type) else value)
+            for key, value in fields.items()
+        )
+        for key in sorted(fields):
+            value = fields[key]
+            digest.update('{}:{}:'.format(len(key), len(value)).encode('ascii') + key + value)
+        return digest.hexdigest()
+
+    def _get(self, connection, real_stored_key):
+        return connection.hgetall(real_stored_key) or None
+
+    def _decode_stored(self, session_data):
+        return self.decode_fields(session_data)
+
+    def add(self, session_key, session_data, expiry_age):
+        connection = self.server.connect(session_key)
+        if not session_data:
+            # Empty hashes can't be stored
+            return not connection.exists(self.get_real_stored_key(session_key))
+
+        if self._add_script is None:
+            self._add_script = connection.register_script(ADD_SCRIPT)
+
+        added = bool(self._add_script(
+            keys=[self.get_real_stored_key(session_key)],
+            args=[expiry_age] + self.encode_fields(session_data),
+            client=connection
+        ))
+        if added:
+            self._index_sessions({session_key: session_data}, expiry_age)
+        return added
+
+    def _get_many(self, connection, real_stored_keys):
+        pipeline = connection.pipeline(transaction=False)
+        for real_stored_key in real_stored_keys:
+            pipeline.hgetall(real_stored_key)
+        return [fields or None for fields in pipeline.execute()]
+
+    def _pipeline_get(self, pipeline, real_stored_key):
+        pipeline.hgetall(real_stored_key)
+
+    def _pipeline_update(self, pipeline, session_key, session_data, expiry_age):
+        real_stored_key = self.get_real_stored_key(session_key)
+        pipeline.delete(real_stored_key)
+        if session_data:
+            pipeline.execute_command('HSET', real_stored_key, *self.encode_fields(session_data))
+            pipeline.expire(real_stored_key, expiry_age)
+
+    def update(self, session_key, session_data, expiry_age):
+        pipeline = self.server.connect(session_key).pipeline()
+        self._pipeline_update(pipeline, session_key, session_data, expiry_age)
+        pipeline.execute()
+        self._index_sessions({session_key: session_data}, expiry_age)
+
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        connection = self.server.connect(session_key)
+        if self._update_fields_script is None:
+            self._update_fields_script = connection.register_script(UPDATE_FIELDS_SCRIPT)
+
+        changed_keys = [key for key in changed_keys if key in session_data]
+        updated = self._update_fields_script(
+            keys=[self.get_real_stored_key(session_key)],
+            args=[expiry_age, len(changed_keys)] +
+            self.encode_fields(session_data, changed_keys) +
+            list(deleted_keys),
+            client=connection
+        )
+
+        if not updated:
+            # The session has expired, so partial changes can't be applied
+            self.update(session_key, session_data, expiry_age)
+        else:
+            self._index_sessions({session_key: session_data}, expiry_age)
+
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        # Fingerprints of hashes can't be computed by a script, since the
+        # order of fields isn't defined, so the hash is watched instead
+        real_stored_key = self.get_real_stored_key(session_key)
+        with self.server.connect(session_key).pipeline() as pipeline:
+            try:
+                pipeline.watch(real_stored_key)
+                fields = pipeline.hgetall(real_stored_key)
+                if not fields or self.get_encoded_fingerprint(fields) != fingerprint:
+                    return False
+
+                pipeline.multi()
+                self._pipeline_update(pipeline, session_key, session_data, expiry_age)
+                pipeline.execute()
+            except redis.WatchError:
+                return False
+
+        self._index_sessions({session_key: session_data}, expiry_age)
+        return True
+
+    def get_version(self, session_key):
+        raise NotImplementedError
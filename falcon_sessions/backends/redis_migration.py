@@ -0,0 +1,123 @@
+from __future__ import unicode_literals, absolute_import
+
+import redis
+
+from .redis import is_busy_key_error
+
+
+class RedisSessionMigrator(object):
+
+    """Moves sessions to the servers they belong to in the current topology.
+
+    Every source server is scanned in batches. Keys that belong to another
+    server of ``storage.server`` are copied there with DUMP/RESTORE in
+    pipelines and deleted from the source server. If the key already
+    exists on the target server, it has been written after the topology
+    change, so the target copy is kept. Keys that can't be restored for
+    other reasons, like a full target server, are kept on the source
+    server and counted in ``failed_count``.
+
+    Keys are matched by ``match``, which defaults to the prefix of the
+    storage. Either of them is required, so that keys of other
+    applications in the same database are never moved.
+
+    :param storage: storage with the current topology
+    :type storage: RedisSessionStorage
+    :param source_servers: servers to scan. Default: servers of
+        ``storage.server`` and ``storage.previous_server``
+    :type source_servers: list[AbstractRedisServer]
+    :param batch_size: number of keys per SCAN call and per pipeline
+    :type batch_size: int
+    :param match: SCAN pattern of keys to migrate. Default: ``<prefix>:*``
+    :type match: basestring
+    """
+
+    def __init__(self, storage, source_servers=None, batch_size=1000, match=None):
+        if match is None:
+            if not storage.prefix:
+                raise ValueError('Migrating a storage without a prefix requires a match pattern')
+            match = storage.get_real_stored_key('*')
+
+        self.storage = storage
+        self.source_servers = source_servers
+        self.batch_size = batch_size
+        self.match = match
+        self.scanned_count = 0
+        self.moved_count = 0
+        self.skipped_count = 0
+        self.failed_count = 0
+
+    def get_source_servers(self):
+        if self.source_servers is not None:
+            return list(self.source_servers)
+
+        return self.storage.get_servers()
+
+    def migrate(self):
+        """Migrates sessions of all source servers."""
+        for server in self.get_source_servers():
+            self.migrate_server(server)
+
+    def migrate_server(self, server):
+        """Migrates sessions of the given server."""
+        connection = server.connect(None)
+
+        batch = []
+        for key in connection.scan_iter(match=self.match, count=self.batch_size):
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                self._migrate_batch(server, connection, batch)
+                batch = []
+
+        if batch:
+            self._migrate_batch(server, connection, batch)
+
+    def _migrate_batch(self, server, connection, keys):
+        self.scanned_count += len(keys)
+
+        targets = {}
+        for key in keys:
+            target = self.storage.server.get_server(self.storage.get_session_key(key))
+            if target.name != server.name:
+                targets.setdefault(target.name, (target, []))[1].append(key)
+
+        if not targets:
+            return
+
+        misplaced_keys = [key for _, target_keys in targets.values() for key in target_keys]
+        pipeline = connection.pipeline(transaction=False)
+        for key in misplaced_keys:
+            pipeline.dump(key)
+            pipeline.pttl(key)
+        results = pipeline.execute()
+        dumps = dict(zip(misplaced_keys, zip(results[::2], results[1::2])))
+
+        processed_keys = []
+        for target, target_keys in targets.values():
+            restored_keys = []
+            pipeline = target.connect(None).pipeline(transaction=False)
+            for key in target_keys:
+                value, ttl = dumps[key]
+                if value is None:
+                    # The session has expired or has been moved by a read
+                    continue
+
+                pipeline.restore(key, ttl if ttl > 0 else 0, value)
+                restored_keys.append(key)
+
+            if not restored_keys:
+                continue
+
+            for key, result in zip(restored_keys, pipeline.execute(raise_on_error=False)):
+                if not isinstance(result, redis.ResponseError):
+                    self.moved_count += 1
+                elif is_busy_key_error(result):
+                    self.skipped_count += 1
+                else:
+                    self.failed_count += 1
+                    continue
+
+                processed_keys.append(key)
+
+        if processed_keys:
+            connection.delete(*processed_keys)
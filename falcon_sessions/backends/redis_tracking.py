@@ -0,0 +1,275 @@
+from __future__ import unicode_literals, absolute_import
+
+import os
+import threading
+
+import redis
+
+from .cache import LocalCache
+from .redis import RedisSessionStorage
+
+INVALIDATE_CHANNEL = '__redis__:invalidate'
+
+
+class _Reservation(object):
+
+    """Placeholder of a cache entry that is being read from Redis."""
+
+    def __init__(self, generation):
+        self.generation = generation
+
+
+class ServerTracker(object):
+
+    """Local cache of session data stored on a single Redis server.
+
+    A background thread subscribes a dedicated connection to invalidation
+    messages and enables ``CLIENT TRACKING`` in broadcasting mode for keys
+    with the storage prefix on another connection, redirecting the
+    messages to the subscriber (RESP2 redirect mode). Whenever any client
+    modifies a key, Redis pushes its name and the cached copy is dropped.
+
+    The cache is used only while the subscriber is connected. If the
+    server doesn't support tracking, the cache is never used.
+
+    :param server: concrete Redis server
+    :type server: AbstractRedisServer
+    :param prefix: prefix of tracked keys
+    :type prefix: basestring
+    :param maxsize: maximum number of cached sessions
+    :type maxsize: int
+    :param ping_interval: number of seconds between health checks of the
+        tracking connection
+    :type ping_interval: float
+    :param reconnect_interval: number of seconds between reconnection attempts
+    :type reconnect_interval: float
+    """
+
+    def __init__(self, server, prefix, maxsize, ping_interval=1, reconnect_interval=1):
+        self.server = server
+        self.prefix = prefix
+        self.ping_interval = ping_interval
+        self.reconnect_interval = reconnect_interval
+        self.cache = LocalCache(maxsize)
+        self.available = False
+        self.supported = True
+        self.invalidation_count = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='falcon-sessions-tracker-{}'.format(self.server.name))
+                self._thread.daemon = True
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get(self, key):
+        """Returns cached data or ``None``."""
+        if not self.available:
+            return None
+
+        value = self.cache.get(key)
+        return None if isinstance(value, _Reservation) else value
+
+    def reserve(self, key):
+        """Marks the key as being read. Returns the reservation that must be
+        passed to :meth:`set` to cache the read data.
+        """
+        if not self.available:
+            return None
+
+        with self._lock:
+            reservation = _Reservation(self._generation)
+            self.cache.set(key, reservation)
+            return reservation
+
+    def set(self, key, reservation, value):
+        """Caches the data if the key hasn't been invalidated since it was
+        reserved.
+        """
+        if reservation is None:
+            return
+
+        with self._lock:
+            if reservation.generation == self._generation and self.cache.get(key) is reservation:
+                self.cache.set(key, value)
+
+    def invalidate(self, keys):
+        with self._lock:
+            self.invalidation_count += 1
+            if keys is None:
+                self._generation += 1
+                self.cache.clear()
+            else:
+                for key in keys:
+                    self.cache.pop(key)
+
+    def _create_connection(self, **options):
+        pool = self.server.connect(None).connection_pool
+        kwargs = dict(pool.connection_kwargs, **options)
+        if redis.VERSION >= (5, 0):
+            # Invalidation messages are read as RESP2 Pub/Sub messages
+            kwargs['protocol'] = 2
+            for key in ('maint_notifications_config', 'maint_notifications_pool_handler'):
+                kwargs.pop(key, None)
+
+        return pool.connection_class(**kwargs)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except redis.ResponseError:
+                # CLIENT TRACKING is not supported by the server
+                self.supported = False
+            except Exception:
+                pass
+            finally:
+                self.available = False
+                self.invalidate(None)
+
+            if not self.supported:
+                return
+
+            self._stopped.wait(self.reconnect_interval)
+
+    def _listen(self):
+        subscriber = self._create_connection()
+        tracker = self._create_connection()
+        try:
+            subscriber.send_command('CLIENT', 'ID')
+            client_id = subscriber.read_response()
+            subscriber.send_command('SUBSCRIBE', INVALIDATE_CHANNEL)
+            subscriber.read_response()
+
+            args = ['CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST']
+            if self.prefix:
+                args.extend(['PREFIX', self.prefix])
+            tracker.send_command(*args)
+            tracker.read_response()
+
+            self.available = True
+            while not self._stopped.is_set():
+                # Waiting for a message doesn't disconnect on timeout, unlike
+                # reading with a socket timeout
+                if not subscriber.can_read(timeout=self.ping_interval):
+                    # Tracking stops silently if the tracking connection is closed
+                    tracker.send_command('PING')
+                    tracker.read_response()
+                    continue
+
+                response = subscriber.read_response()
+                if response[0] in (b'message', 'message'):
+                    self.invalidate(response[2])
+        finally:
+            subscriber.disconnect()
+            tracker.disconnect()
+
+
+class TrackingRedisSessionStorage(RedisSessionStorage):
+
+    """Redis session storage with server-assisted client-side caching.
+
+    Encoded session data is cached in process memory and invalidated by
+    Redis when any client modifies the key, so cached reads stay coherent
+    between processes. Requires Redis 6 or later; reads fall back to plain
+    GET when tracking is not available.
+
+    :param tracking_maxsize: maximum number of cached sessions per server.
+        Default: 10000
+    :type tracking_maxsize: int
+    """
+
+    def __init__(self, server, prefix='', tracking_maxsize=10000, **kwargs):
+        super(TrackingRedisSessionStorage, self).__init__(server, prefix=prefix, **kwargs)
+        self.tracking_maxsize = tracking_maxsize
+        self._trackers = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_tracker(self, session_key):
+        if self._pid != os.getpid():
+            # Listener threads don't survive a fork, so a child process
+            # starts its own trackers
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._trackers = {}
+                    self._pid = os.getpid()
+
+        server = self.server.get_server(session_key)
+        tracker = self._trackers.get(server.name)
+        if tracker is None:
+            with self._lock:
+                tracker = self._trackers.get(server.name)
+                if tracker is None:
+                    prefix = self.get_real_stored_key('') if self.prefix else ''
+                    tracker = ServerTracker(server, prefix, self.tracking_maxsize)
+                    tracker.start()
+                    self._trackers[server.name] = tracker
+
+        return tracker
+
+    def close(self):
+        """Stops invalidation listeners."""
+        with self._lock:
+            trackers, self._trackers = self._trackers, {}
+
+        for tracker in trackers.values():
+            tracker.stop()
+
+    def get_encoded(self, session_key):
+        tracker = self.get_tracker(session_key)
+        real_stored_key = self.get_real_stored_key(session_key).encode('utf-8')
+
+        session_data = tracker.get(real_stored_key)
+        if session_data is not None:
+            return session_data
+
+        reservation = tracker.reserve(real_stored_key)
+        session_data = super(TrackingRedisSessionStorage, self).get_encoded(session_key)
+        if session_data is not None:
+            tracker.set(real_stored_key, reservation, session_data)
+
+        return session_data
+
+    def _forget(self, session_key):
+        tracker = self.get_tracker(session_key)
+        tracker.invalidate([self.get_real_stored_key(session_key).encode('utf-8')])
+
+    # Invalidation messages are asynchronous, so own writes are forgotten
+    # immediately to read them back in the same process
+
+    def add(self, session_key, session_data, expiry_age):
+        added = super(TrackingRedisSessionStorage, self).add(session_key, session_data, expiry_age)
+        self._forget(session_key)
+        return added
+
+    def update(self, session_key, session_data, expiry_age):
+        super(TrackingRedisSessionStorage, self).update(session_key, session_data, expiry_age)
+        self._forget(session_key)
+
+    def delete(self, session_key):
+        deleted = super(TrackingRedisSessionStorage, self).delete(session_key)
+        self._forget(session_key)
+        return deleted
+
+    def update_many(self, sessions, expiry_age):
+        super(TrackingRedisSessionStorage, self).update_many(sessions, expiry_age)
+        for session_key in sessions:
+            self._forget(session_key)
+
+    def delete_many(self, session_keys):
+        session_keys = list(session_keys)
+        deleted = super(TrackingRedisSessionStorage, self).delete_many(session_keys)
+        for session_key in session_keys:
+            self._forget(session_key)
+        return deleted
@@ -0,0 +1,183 @@
+from __future__ import unicode_literals
+
+import threading
+import zlib
+
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compressed payloads start with this byte followed by the algorithm byte,
+# so compressed and uncompressed payloads can be stored side by side.
+# Uncompressed payloads that start with it get the header of no compression.
+HEADER = b'\x00'
+UNCOMPRESSED = b'\x00'
+
+
+class AbstractCompressor(object):
+
+    """Compressor of serialized session data.
+
+    :param threshold: minimal size of serialized data in bytes that is
+        compressed. Default: 1024
+    :type threshold: int
+    """
+
+    # Single byte that identifies the algorithm in compressed payloads
+    algorithm = None
+
+    def __init__(self, threshold=1024):
+        self.threshold = threshold
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+
+class ZlibCompressor(AbstractCompressor):
+
+    """Compressor using zlib.
+
+    :param level: compression level from 1 to 9. Default: 6
+    :type level: int
+    """
+
+    algorithm = b'\x01'
+
+    def __init__(self, threshold=1024, level=6):
+        super(ZlibCompressor, self).__init__(threshold)
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class Lz4Compressor(AbstractCompressor):
+
+    """Compressor using LZ4 blocks. Requires the ``lz4`` package.
+
+    Compresses worse than zlib but is several times faster.
+    """
+
+    algorithm = b'\x02'
+
+    def __init__(self, threshold=1024):
+        if lz4 is None:
+            raise ImportError('Lz4Compressor requires lz4 package')
+
+        super(Lz4Compressor, self).__init__(threshold)
+
+    def compress(self, data):
+        return lz4.block.compress(data)
+
+    def decompress(self, data):
+        return lz4.block.decompress(data)
+
+
+class ZstdCompressor(AbstractCompressor):
+
+    """Compressor using Zstandard. Requires the ``zstandard`` package.
+
+    A dictionary trained on typical sessions with :meth:`train_dictionary`
+    greatly improves compression of small payloads. Data compressed with a
+    dictionary can be decompressed only with the same dictionary.
+
+    :param level: compression level from 1 to 22. Default: 3
+    :type level: int
+    :param dictionary: trained dictionary
+    :type dictionary: bytes
+    """
+
+    algorithm = b'\x03'
+
+    def __init__(self, threshold=1024, level=3, dictionary=None):
+        if zstandard is None:
+            raise ImportError('ZstdCompressor requires zstandard package')
+
+        super(ZstdCompressor, self).__init__(threshold)
+        self.level = level
+        self.dictionary = None
+        if dictionary is not None:
+            self.dictionary = zstandard.ZstdCompressionDict(dictionary)
+            self.dictionary.precompute_compress(level=level)
+
+        # Contexts can't be shared between threads
+        self._local = threading.local()
+
+    @staticmethod
+    def train_dictionary(samples, size=16384):
+        """Returns a dictionary trained on the given serialized sessions."""
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+    def compress(self, data):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self.dictionary)
+        return compressor.compress(data)
+
+    def decompress(self, data):
+        decompressor = getattr(self._local, 'decompressor', None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor(
+                dict_data=self.dictionary)
+        return decompressor.decompress(data)
+
+
+def compress(data, compressor):
+    """Returns data compressed with a header if it exceeds the threshold
+    of the compressor, otherwise the data as is.
+    """
+    if compressor is None or len(data) < compressor.threshold:
+        if data[:1] == HEADER:
+            return HEADER + UNCOMPRESSED + data
+        return data
+
+    return HEADER + compressor.algorithm + compressor.compress(data)
+
+
+_default_compressors = {}
+
+
+def _get_default_compressor(algorithm):
+    compressor = _default_compressors.get(algorithm)
+    if compressor is None:
+        for compressor_class in (ZlibCompressor, Lz4Compressor, ZstdCompressor):
+            if compressor_class.algorithm == algorithm:
+                compressor = _default_compressors[algorithm] = compressor_class()
+                break
+        else:
+            raise ValueError('Unknown compression algorithm')
+
+    return compressor
+
+
+def decompress(data, compressor=None):
+    """Returns decompressed data if it has a compression header, otherwise
+    the data as is.
+
+    Data compressed with other built-in algorithms than the given compressor
+    is decompressed too, so the compressor can be changed at any time.
+    """
+    if data[:1] != HEADER:
+        return data
+
+    algorithm = bytes(data[1:2])
+    if algorithm == UNCOMPRESSED:
+        return data[2:]
+
+    if compressor is None or compressor.algorithm != algorithm:
+        compressor = _get_default_compressor(algorithm)
+
+    return compressor.decompress(data[2:])
@@ -0,0 +1,68 @@
+from __future__ import unicode_literals
+
+import base64
+import hmac
+import time
+
+from .signers import HmacSigner
+
+
+class SessionCookieSigner(object):
+
+    """Signer of session cookie values.
+
+    Signed values look like ``key.timestamp.signature``, so forged or
+    expired cookies are rejected without a storage lookup.
+
+    :param secret_key: secret key
+    :type secret_key: basestring | bytes
+    :param max_age: number of seconds a signed value is valid. It should be
+        longer than the session lifetime, since cookies are signed again
+        only when the session is saved. Default: None (forever)
+    :type max_age: int
+    :param signer: signer of values. Default: HmacSigner with ``secret_key``
+    :type signer: AbstractSigner
+    :param timer: function that returns the current time
+    :type timer: callable
+    """
+
+    separator = '.'
+
+    def __init__(self, secret_key=None, max_age=None, signer=None, timer=time.time):
+        if signer is None:
+            if secret_key is None:
+                raise ValueError('Either secret_key or signer is required')
+            signer = HmacSigner(secret_key)
+
+        self.signer = signer
+        self.max_age = max_age
+        self.timer = timer
+
+    def get_signature(self, value):
+        digest = self.signer.get_digest(value.encode('utf-8'))
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+    def sign(self, session_key):
+        """Returns signed cookie value of the session key."""
+        value = '{}{}{:x}'.format(session_key, self.separator, int(self.timer()))
+        return value + self.separator + self.get_signature(value)
+
+    def unsign(self, cookie_value):
+        """Returns the session key or ``None`` if the cookie value is forged
+        or expired.
+        """
+        try:
+            value, signature = cookie_value.rsplit(self.separator, 1)
+            session_key, timestamp = value.rsplit(self.separator, 1)
+            timestamp = int(timestamp, 16)
+        except ValueError:
+            return None
+
+        expected_signature = self.get_signature(value)
+        if not hmac.compare_digest(expected_signature.encode('ascii'), signature.encode('utf-8')):
+            return None
+
+        if self.max_age is not None and timestamp + self.max_age < self.timer():
+            return None
+
+        return session_key
@@ -0,0 +1,81 @@
+"""Exports all sessions stored in Redis as JSON lines.
+
+Usage::
+
+    python -m falcon_sessions.export --url redis://host1:6379/0 --url redis://host2:6379/0 --prefix sessions
+
+Every line is a JSON object with ``key``, ``ttl`` and ``data`` of a session.
+Values that aren't supported by JSON are exported as strings.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import sys
+
+from .backends.redis import RedisPool, RedisServer, RedisSessionStorage, WeighedServer
+from .backends.redis_hash import RedisHashSessionStorage
+from .serializers import JSONSerializer, MsgpackSerializer, PickleSerializer
+from .signers import HmacSigner, Sha1Signer
+
+STORAGES = {
+    'string': RedisSessionStorage,
+    'hash': RedisHashSessionStorage,
+}
+
+SERIALIZERS = {
+    'pickle': PickleSerializer,
+    'json': JSONSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(description='Export sessions stored in Redis as JSON lines.')
+    parser.add_argument('--url', action='append', required=True,
+                        help='Redis URL, can be repeated for every server of a pool')
+    parser.add_argument('--prefix', required=True, help='prefix of keys in Redis')
+    parser.add_argument('--storage', choices=sorted(STORAGES), default='string',
+                        help='storage format of sessions. Default: string')
+    parser.add_argument('--serializer', choices=sorted(SERIALIZERS), default='pickle',
+                        help='serializer of sessions. Default: pickle')
+    parser.add_argument('--hmac-secret', help='secret key of HmacSigner. Default: Sha1Signer is used')
+    parser.add_argument('--batch-size', type=int, default=1000, help='number of keys per round trip')
+    parser.add_argument('--output', help='output file. Default: stdout')
+    return parser
+
+
+def create_storage(args):
+    servers = [RedisServer(url=url) for url in args.url]
+    server = servers[0] if len(servers) == 1 else RedisPool(*[WeighedServer(1, server) for server in servers])
+    signer = HmacSigner(args.hmac_secret) if args.hmac_secret else Sha1Signer()
+    return STORAGES[args.storage](
+        server, prefix=args.prefix, serializer=SERIALIZERS[args.serializer](), signer=signer)
+
+
+def export(storage, output, batch_size=None):
+    """Writes all sessions of the storage to the file. Returns the number of
+    exported sessions.
+    """
+    count = 0
+    for session_key, session_data, ttl in storage.scan(batch_size=batch_size):
+        output.write(json.dumps({'key': session_key, 'ttl': ttl, 'data': session_data}, default=str))
+        output.write('\n')
+        count += 1
+    return count
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    storage = create_storage(args)
+    if args.output is None:
+        count = export(storage, sys.stdout, args.batch_size)
+    else:
+        with open(args.output, 'w') as output:
+            count = export(storage, output, args.batch_size)
+
+    print('Exported {} sessions'.format(count), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -33,8 +33,52 @@ class SessionMiddleware(object):
         when the Web browser is closed. Default: False
     :type session_expiry_at_browser_close: bool
     :param session_refresh_each_request: whether to save the session data on every
-        request. Default: False
+        request. Unmodified sessions only get their expiry refreshed. Default: False
     :type session_refresh_each_request: bool
+    :param session_refresh_threshold: fraction of the session lifetime that must
+        elapse before the expiry of an unmodified session is refreshed again.
+        Default: 0 (refresh on every request)
+    :type session_refresh_threshold: float
+    :param session_lazy_load: whether to read the session data from the storage
+        only when the session is accessed. Sessions that are not accessed
+        by a handler are not saved. Default: False
+    :type session_lazy_load: bool
+    :param session_skip_unchanged: whether to compare fingerprints of the loaded
+        and the modified session data, and skip saving the session if they are
+        equal. Costs encoding the data once more for every modified session.
+        Default: False
+    :type session_skip_unchanged: bool
+    :param session_detect_nested_changes: whether to compare fingerprints of the
+        loaded and the current data of sessions that have been loaded but not
+        modified, and save the session if they differ. This detects in-place
+        changes of nested values, like ``session['cart'].append(item)`` or
+        ``session.data['cart'].append(item)``, at the cost of encoding the data
+        once more for every loaded session.
+        Modified sessions are always saved whole.
+        Default: False
+    :type session_detect_nested_changes: bool
+    :param session_cookie_signer: signer of session cookies. Cookies with
+        invalid signatures are ignored without a storage lookup. Enabling it
+        invalidates existing unsigned cookies. Default: None (unsigned cookies)
+    :type session_cookie_signer: SessionCookieSigner
+    :param session_writer: writer that saves existing sessions after the
+        response is sent. New sessions are saved and deleted sessions are
+        deleted immediately.
+        Default: None (save in the request thread)
+    :type session_writer: BackgroundWriter
+    :param session_optimistic_locking: whether to save modified sessions only
+        if they haven't been changed by concurrent requests since they were
+        loaded. Otherwise the session is loaded again, the keys set and
+        deleted by the request are applied to it, and saving is retried.
+        Requires a storage with ``compare_and_update()``. Modified sessions
+        are saved in the request thread even with ``session_writer``, and
+        nested changes are kept only if the top-level key is set again.
+        Default: False
+    :type session_optimistic_locking: bool
+    :param session_conflict_retries: number of retries of saving a session
+        changed by concurrent requests, after which it is overwritten.
+        Default: 3
+    :type session_conflict_retries: int
     """
 
     def __init__(self,
@@ -46,7 +90,15 @@ class SessionMiddleware(object):
                  session_cookie_path=b'/',
                  session_cookie_http_only=True,
                  session_expiry_at_browser_close=False,
-                 session_refresh_each_request=False):
+                 session_refresh_each_request=False,
+                 session_refresh_threshold=0,
+                 session_lazy_load=False,
+                 session_skip_unchanged=False,
+                 session_detect_nested_changes=False,
+                 session_cookie_signer=None,
+                 session_writer=None,
+                 session_optimistic_locking=False,
+                 session_conflict_retries=3):
         self.session_storage = session_storage
         self.session_lifetime = session_lifetime
         self.session_cookie_name = session_cookie_name
@@ -56,6 +108,14 @@ class SessionMiddleware(object):
         self.session_cookie_http_only = session_cookie_http_only
         self.session_expiry_at_browser_close = session_expiry_at_browser_close
         self.session_refresh_each_request = session_refresh_each_request
+        self.session_refresh_threshold = session_refresh_threshold
+        self.session_lazy_load = session_lazy_load
+        self.session_skip_unchanged = session_skip_unchanged
+        self.session_detect_nested_changes = session_detect_nested_changes
+        self.session_cookie_signer = session_cookie_signer
+        self.session_writer = session_writer
+        self.session_optimistic_locking = session_optimistic_locking
+        self.session_conflict_retries = session_conflict_retries
 
     def get_expiry_age(self, session):
         """Returns the number of seconds until the session expires."""
@@ -85,8 +145,20 @@ class SessionMiddleware(object):
 
         return expiry == 0
 
+    def get_cookie_max_age(self, session, expiry_age):
+        """Returns max age of the session cookie, or ``None`` if the cookie
+        expires when the browser closes.
+        """
+        if self.get_expire_at_browser_close(session):
+            return None
+
+        return expiry_age
+
     def set_session_cookie(self, resp, session_key, max_age=None):
         """Sets session cookie."""
+        if self.session_cookie_signer is not None:
+            session_key = self.session_cookie_signer.sign(session_key)
+
         resp.set_cookie(
             name=self.session_cookie_name,
             value=session_key,
@@ -110,22 +182,101 @@ class SessionMiddleware(object):
             max_age=-1
         )
 
-    def process_request(self, req, resp):
+    def load_session_data(self, session, session_key):
+        """Returns session data from the storage or ``None`` if the session
+        doesn't exist. Sets the fingerprint of the session if the middleware
+        compares fingerprints.
+        """
+        if not (self.session_skip_unchanged or self.session_detect_nested_changes or
+                self.session_optimistic_locking):
+            return self.session_storage.load(session_key)
+
+        result = self.session_storage.load_with_fingerprint(session_key)
+        if result is None:
+            return None
+
+        session_data, session.fingerprint = result
+        return session_data
+
+    def is_unchanged(self, session):
+        """Returns ``True`` if the session data is known to be equal to the
+        loaded data.
+        """
+        return (session.fingerprint is not None and
+                session.fingerprint == self.session_storage.get_fingerprint(session.data))
+
+    def save_locked(self, session, expiry_age):
+        """Saves the modified session if it hasn't been changed since it was
+        loaded, otherwise applies the changes of the request to the stored
+        data and retries. Returns ``False`` without saving the session if it
+        no longer exists in the storage.
+        """
+        session_data = session.data
+        fingerprint = session.fingerprint
+        for _ in range(self.session_conflict_retries + 1):
+            if fingerprint is None:
+                break
+
+            if self.session_storage.compare_and_update(session.key, session_data, expiry_age, fingerprint):
+                return True
+
+            result = self.session_storage.load_with_fingerprint(session.key)
+            if result is None:
+                # The session has been deleted by another request, like a
+                # logout, or has expired, so it must not be recreated
+                return False
+
+            if session.cleared:
+                # The request replaces the data
+                break
+
+            session_data, fingerprint = result
+            for key in session.deleted_keys:
+                session_data.pop(key, None)
+            for key in session.changed_keys:
+                if key in session.data:
+                    session_data[key] = session.data[key]
+
+        self.session_storage.update(session.key, session_data, expiry_age)
+        return True
+
+    def get_session_key(self, req):
+        """Returns session key from the session cookie or ``None``."""
         session_key = req.cookies.get(self.session_cookie_name)
-        if session_key is not None and self.session_storage.exists(session_key):
-            req.session = Session(
-                key=session_key,
-                data=self.session_storage.read(session_key)
-            )
-        else:
+        if session_key is not None and self.session_cookie_signer is not None:
+            session_key = self.session_cookie_signer.unsign(session_key)
+
+        return session_key
+
+    def process_request(self, req, resp):
+        session_key = self.get_session_key(req)
+        if session_key is None:
             req.session = Session()
+            return
+
+        session = Session(
+            key=session_key,
+            loader=lambda: self.load_session_data(session, session_key)
+        )
+        if not self.session_lazy_load:
+            session.load()
+
+        req.session = session
 
     def process_response(self, req, resp, resource, req_succeeded):
         session = req.session
 
+        if not session.loaded and not self.session_refresh_each_request:
+            # The handler hasn't accessed the session, so it can't be modified
+            return
+
+        writer = self.session_writer
+        if writer is None:
+            writer = self.session_storage
+
         if not session.data:
             if session.modified and session.key is not None:
-                self.session_storage.delete(session.key)
+                writer.delete(session.key)
 
             if self.session_cookie_name in req.cookies:
                 self.unset_session_cookie(resp)
@@ -137,17 +288,39 @@ class SessionMiddleware(object):
         if session.accessed:
             resp.append_header('Vary', 'Cookie')
 
-        if req_succeeded and (session.modified or self.session_refresh_each_request):
-            max_age = None
+        modified = session.modified
+        if modified and self.session_skip_unchanged:
+            modified = not self.is_unchanged(session)
+        elif not modified and session.loaded and self.session_detect_nested_changes:
+            # Nested values may also be changed through ``session.data``,
+            # which doesn't mark the session as accessed
+            modified = session.fingerprint is not None and not self.is_unchanged(session)
+
+        if req_succeeded and (modified or self.session_refresh_each_request):
             expiry_age = self.get_expiry_age(session)
-            if not self.get_expire_at_browser_close(session):
-                max_age = expiry_age
+            max_age = self.get_cookie_max_age(session, expiry_age)
 
             session_key = session.key
             if session_key is None:
                 session_key = self.session_storage.create(
                     session.data, expiry_age)
-            else:
+            elif modified and self.session_optimistic_locking:
+                if not self.save_locked(session, expiry_age):
+                    self.unset_session_cookie(resp)
+                    return
+            elif modified and not session.cleared and not self.session_detect_nested_changes:
+                # Keys with nested changes aren't tracked, so otherwise
+                # the whole data is saved
+                writer.update_fields(
+                    session_key, session.data, session.changed_keys,
+                    session.deleted_keys, expiry_age)
+            elif modified:
+                writer.update(session_key, session.data, expiry_age)
+            elif self.session_writer is not None:
+                self.session_writer.touch(
+                    session_key, session.data, expiry_age, self.session_refresh_threshold)
+            elif not self.session_storage.touch(
+                    session_key, expiry_age, self.session_refresh_threshold):
                 self.session_storage.update(
                     session_key, session.data, expiry_age)
 
@@ -0,0 +1,74 @@
+from __future__ import unicode_literals
+
+from .middleware import SessionMiddleware
+from .session import Session
+
+
+class AsyncSessionMiddleware(SessionMiddleware):
+
+    """Session middleware for Falcon ASGI applications.
+
+    Accepts the same parameters as :class:`SessionMiddleware`, but
+    ``session_storage`` must be an :class:`AbstractAsyncSessionStorage`.
+    Handlers access ``req.session`` synchronously, so sessions are always
+    loaded before the handler is called and ``session_lazy_load`` is
+    ignored. ``session_skip_unchanged``, ``session_detect_nested_changes``,
+    ``session_writer`` and ``session_optimistic_locking`` aren't supported.
+    """
+
+    unsupported_options = (
+        'session_skip_unchanged',
+        'session_detect_nested_changes',
+        'session_writer',
+        'session_optimistic_locking',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncSessionMiddleware, self).__init__(*args, **kwargs)
+        for option in self.unsupported_options:
+            # Writers with no pending writes are false
+            if getattr(self, option) not in (None, False):
+                raise ValueError('{} is not supported by {}'.format(option, type(self).__name__))
+
+    async def process_request_async(self, req, resp):
+        session_key = self.get_session_key(req)
+        session_data = None
+        if session_key is not None:
+            session_data = await self.session_storage.load(session_key)
+
+        if session_data is not None:
+            req.session = Session(key=session_key, data=session_data)
+        else:
+            req.session = Session()
+
+    async def process_response_async(self, req, resp, resource, req_succeeded):
+        session = req.session
+
+        if not session.data:
+            if session.modified and session.key is not None:
+                await self.session_storage.delete(session.key)
+
+            if self.session_cookie_name in req.cookies:
+                self.unset_session_cookie(resp)
+
+            return
+
+        # Without "Vary:Cookie", authenticated users would also be
+        # served the anonymous page from the browser cache
+        if session.accessed:
+            resp.append_header('Vary', 'Cookie')
+
+        if req_succeeded and (session.modified or self.session_refresh_each_request):
+            expiry_age = self.get_expiry_age(session)
+            max_age = self.get_cookie_max_age(session, expiry_age)
+
+            session_key = session.key
+            if session_key is None:
+                session_key = await self.session_storage.create(
+                    session.data, expiry_age)
+            elif session.modified or not await self.session_storage.touch(
+                    session_key, expiry_age, self.session_refresh_threshold):
+                await self.session_storage.update(
+                    session_key, session.data, expiry_age)
+
+            self.set_session_cookie(resp, session_key, max_age=max_age)
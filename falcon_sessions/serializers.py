@@ -1,19 +1,38 @@
 from __future__ import unicode_literals
 
 import json
+import struct
+from datetime import date, datetime, timedelta
 
 try:
     from six.moves import cPickle as pickle
 except ImportError:
     import pickle
 
+try:
+    from datetime import timezone
+except ImportError:  # Python 2
+    timezone = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_naive_datetime = struct.Struct('>HBBBBBI')
+_aware_datetime = struct.Struct('>HBBBBBIi')
+_date = struct.Struct('>HBB')
+_timedelta = struct.Struct('>iII')
+
 
 class AbstractSerializer(object):
 
     def dumps(self, obj):
+        """Returns the object serialized as bytes."""
         raise NotImplementedError
 
     def loads(self, data):
+        """Returns the object deserialized from bytes."""
         raise NotImplementedError
 
 
@@ -38,3 +57,106 @@ class JSONSerializer(AbstractSerializer):
 
     def loads(self, data):
         return json.loads(data.decode(self.encoding))
+
+
+class MsgpackSerializer(AbstractSerializer):
+    """Serializer using msgpack. Requires the ``msgpack`` package.
+
+    Besides msgpack types, supports ``datetime``, ``date``, ``timedelta``,
+    ``set`` and ``frozenset`` values. Tuples are loaded as lists. Other types
+    can be supported with :meth:`register`.
+    """
+
+    DATETIME = 1
+    DATE = 2
+    TIMEDELTA = 3
+    SET = 4
+    FROZENSET = 5
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError('MsgpackSerializer requires msgpack package')
+
+        self._encoders = {}
+        self._decoders = {}
+        self.register(datetime, self.DATETIME, self._encode_datetime, self._decode_datetime)
+        self.register(date, self.DATE, self._encode_date, self._decode_date)
+        self.register(timedelta, self.TIMEDELTA, self._encode_timedelta, self._decode_timedelta)
+        self.register(set, self.SET, self._encode_set, self._decode_set)
+        self.register(frozenset, self.FROZENSET, self._encode_set, self._decode_frozenset)
+
+    def register(self, type_, code, encode, decode):
+        """Adds support of a custom type as a msgpack extension type.
+
+        :param type_: type of values. Subclasses must be registered separately
+        :type type_: type
+        :param code: extension type code from 0 to 127, unique per serializer
+        :type code: int
+        :param encode: function that returns a value encoded as bytes
+        :type encode: callable
+        :param decode: function that returns a value decoded from bytes
+        :type decode: callable
+        """
+        if code in self._decoders:
+            raise ValueError('Extension type code {} is already registered'.format(code))
+
+        self._encoders[type_] = (code, encode)
+        self._decoders[code] = decode
+
+    def _default(self, obj):
+        try:
+            code, encode = self._encoders[type(obj)]
+        except KeyError:
+            raise TypeError('Object of type {} is not serializable'.format(type(obj).__name__))
+
+        return msgpack.ExtType(code, encode(obj))
+
+    def _ext_hook(self, code, data):
+        decode = self._decoders.get(code)
+        if decode is None:
+            return msgpack.ExtType(code, data)
+
+        return decode(data)
+
+    def _encode_datetime(self, value):
+        fields = (value.year, value.month, value.day, value.hour, value.minute,
+                  value.second, value.microsecond)
+        offset = value.utcoffset()
+        if offset is None:
+            return _naive_datetime.pack(*fields)
+
+        return _aware_datetime.pack(*(fields + (offset.days * 86400 + offset.seconds,)))
+
+    def _decode_datetime(self, data):
+        if len(data) == _naive_datetime.size:
+            return datetime(*_naive_datetime.unpack(data))
+
+        fields = _aware_datetime.unpack(data)
+        return datetime(*fields[:7], tzinfo=timezone(timedelta(seconds=fields[7])))
+
+    def _encode_date(self, value):
+        return _date.pack(value.year, value.month, value.day)
+
+    def _decode_date(self, data):
+        return date(*_date.unpack(data))
+
+    def _encode_timedelta(self, value):
+        return _timedelta.pack(value.days, value.seconds, value.microseconds)
+
+    def _decode_timedelta(self, data):
+        return timedelta(*_timedelta.unpack(data))
+
+    def _encode_set(self, value):
+        return self.dumps(list(value))
+
+    def _decode_set(self, data):
+        return set(self.loads(data))
+
+    def _decode_frozenset(self, data):
+        return frozenset(self.loads(data))
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True, default=self._default)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, ext_hook=self._ext_hook, strict_map_key=False)
@@ -8,21 +8,56 @@ class Session(object):
     """Session.
 
     Wrapper around dict that stores information about
-    modifications and accesses.
+    modifications and accesses. Top-level keys that have been set or
+    deleted are tracked, so storages can write only the changes.
 
     :param key: session key
     :type key: basestring
     :param data: session data
     :type data: dict
+    :param loader: callable that returns session data or ``None`` if the
+        session doesn't exist. It is called on the first access to the data
+        instead of passing ``data``
+    :type loader: callable
+
+    ``fingerprint`` is the fingerprint of the loaded data as returned by
+    ``AbstractSessionStorage.load_with_fingerprint()``, or ``None`` if it
+    is unknown.
     """
 
     __not_given = object()
 
-    def __init__(self, key=None, data=None):
+    def __init__(self, key=None, data=None, loader=None):
         self._key = key
-        self._data = data or {}
+        self._session_data = data or {}
+        self._loader = loader
         self._modified = False
         self._accessed = False
+        self._changed_keys = set()
+        self._deleted_keys = set()
+        self._cleared = False
+        self.fingerprint = None
+
+    @property
+    def _data(self):
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            data = loader()
+            if data is None:
+                self._key = None
+                data = {}
+            self._session_data = data
+
+        return self._session_data
+
+    @_data.setter
+    def _data(self, value):
+        self._loader = None
+        self._session_data = value
+
+    def load(self):
+        """Loads the session data if it hasn't been loaded yet."""
+        self._data
 
     def __contains__(self, key):
         self._accessed = True
@@ -34,20 +69,32 @@ class Session(object):
 
     def __setitem__(self, key, value):
         self._data[key] = value
+        self._set_changed(key)
         self._modified = True
         self._accessed = True
 
     def __delitem__(self, key):
         del self._data[key]
+        self._set_deleted(key)
         self._modified = True
         self._accessed = True
 
+    def _set_changed(self, key):
+        self._changed_keys.add(key)
+        self._deleted_keys.discard(key)
+
+    def _set_deleted(self, key):
+        self._deleted_keys.add(key)
+        self._changed_keys.discard(key)
+
     def get(self, key, default=None):
         self._accessed = True
         return self._data.get(key, default)
 
     def pop(self, key, default=__not_given):
-        self._modified = self.modified or key in self._data
+        if key in self._data:
+            self._set_deleted(key)
+            self._modified = True
         self._accessed = True
         args = () if default is self.__not_given else (default,)
         return self._data.pop(key, *args)
@@ -59,10 +106,15 @@ class Session(object):
         else:
             self._modified = True
             self._data[key] = value
+            self._set_changed(key)
             return value
 
     def update(self, dict_):
+        # Iterables of pairs are accepted like in dict.update()
+        dict_ = dict(dict_)
         self._data.update(dict_)
+        for key in dict_:
+            self._set_changed(key)
         self._modified = True
         self._accessed = True
 
@@ -100,7 +152,13 @@ class Session(object):
             return list(self.itervalues())
 
     def clear(self):
+        # The key of a lazy session is verified by loading it, so a cleared
+        # session with an unknown key is saved under a new key
+        self.load()
         self._data = {}
+        self._changed_keys.clear()
+        self._deleted_keys.clear()
+        self._cleared = True
         self._modified = True
         self._accessed = True
 
@@ -112,6 +170,27 @@ class Session(object):
     def key(self):
         return self._key
 
+    @property
+    def loaded(self):
+        return self._loader is None
+
+    @property
+    def changed_keys(self):
+        """Keys that have been set since the session was loaded."""
+        return frozenset(self._changed_keys)
+
+    @property
+    def deleted_keys(self):
+        """Keys that have been deleted since the session was loaded."""
+        return frozenset(self._deleted_keys)
+
+    @property
+    def cleared(self):
+        """Whether the session has been cleared. Changed keys are tracked
+        only since the last clear.
+        """
+        return self._cleared
+
     @property
     def modified(self):
         return self._modified
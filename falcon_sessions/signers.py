@@ -1,24 +1,119 @@
 from __future__ import unicode_literals
 
+import binascii
 import hmac
 import hashlib
 
+import six
+
 
 class AbstractSigner(object):
 
     def get_signature(self, value):
+        """Returns hex signature of the value."""
         raise NotImplementedError
 
+    def get_digest(self, value):
+        """Returns raw signature of the value."""
+        return binascii.unhexlify(self.get_signature(value))
+
+    @property
+    def digest_size(self):
+        """Size of raw signatures in bytes."""
+        return len(self.get_digest(b''))
+
 
 class Sha1Signer(AbstractSigner):
 
-    """Simple sha1 signer."""
+    """Simple sha1 signer.
+
+    The signature isn't keyed, so it detects corruption but not forgery.
+    """
+
+    digest_size = 20
 
     def get_signature(self, value):
         return hashlib.sha1(value).hexdigest()
 
+    def get_digest(self, value):
+        return hashlib.sha1(value).digest()
+
+
+class KeyedHashSigner(AbstractSigner):
+
+    """Base class of signers with a keyed hash.
+
+    The hash object keyed with the secret is created once and copied for
+    every signed value.
+    """
+
+    def __init__(self):
+        self._state = self.create_state()
+
+    def create_state(self):
+        """Returns a hash object keyed with the secret."""
+        raise NotImplementedError
+
+    @property
+    def digest_size(self):
+        return self._state.digest_size
+
+    def get_signature(self, value):
+        state = self._state.copy()
+        state.update(value)
+        return state.hexdigest()
+
+    def get_digest(self, value):
+        state = self._state.copy()
+        state.update(value)
+        return state.digest()
+
 
-class Django14Signer(AbstractSigner):
+def _to_bytes(value):
+    if isinstance(value, six.text_type):
+        return value.encode('utf-8')
+    return value
+
+
+class HmacSigner(KeyedHashSigner):
+
+    """HMAC signer.
+
+    :param secret_key: secret key
+    :type secret_key: basestring | bytes
+    :param digestmod: hash constructor. Default: hashlib.sha256
+    :type digestmod: callable
+    """
+
+    def __init__(self, secret_key, digestmod=hashlib.sha256):
+        self.secret_key = _to_bytes(secret_key)
+        self.digestmod = digestmod
+        super(HmacSigner, self).__init__()
+
+    def create_state(self):
+        return hmac.new(self.secret_key, digestmod=self.digestmod)
+
+
+class Blake2Signer(KeyedHashSigner):
+
+    """Keyed BLAKE2b signer. Faster than HMAC, requires Python 3.6 or later.
+
+    :param secret_key: secret key up to 64 bytes
+    :type secret_key: basestring | bytes
+    :param digest_size: size of signatures in bytes. Default: 32
+    :type digest_size: int
+    """
+
+    def __init__(self, secret_key, digest_size=32):
+        self.secret_key = _to_bytes(secret_key)
+        self._digest_size = digest_size
+        super(Blake2Signer, self).__init__()
+
+    def create_state(self):
+        return hashlib.blake2b(key=self.secret_key, digest_size=self._digest_size)
+
+
+class Django14Signer(KeyedHashSigner):
 
     """Django 1.4 compatible signer.
 
@@ -26,22 +121,26 @@ class Django14Signer(AbstractSigner):
     :type django_secret_key: basestring
     :param django_session_class_name: name of used session class in Django
     :type django_session_class_name: basestring
+
+    Django reads only the legacy format, so storages sharing sessions with
+    Django must be created with ``legacy_encoding=True``.
     """
 
     def __init__(self, django_secret_key, django_session_class_name):
         self.django_secret_key = django_secret_key
         self.django_session_class_name = django_session_class_name
+        super(Django14Signer, self).__init__()
 
-    def get_signature(self, value):
+    def create_state(self):
         key_salt = "django.contrib.sessions" + self.django_session_class_name
 
         # We need to generate a derived key from our base key.  We can do this by
         # passing the key_salt and our base key through a pseudo-random function and
         # SHA1 works nicely.
-        key = hashlib.sha1(key_salt + self.django_secret_key).digest()
+        key = hashlib.sha1(_to_bytes(key_salt + self.django_secret_key)).digest()
 
         # If len(key_salt + secret) > sha_constructor().block_size, the above
         # line is redundant and could be replaced by key = key_salt + secret, since
         # the hmac module does the same thing for keys longer than the block size.
         # However, we need to ensure that we *always* do this.
-        return hmac.new(key, msg=value, digestmod=hashlib.sha1).hexdigest()
+        return hmac.new(key, digestmod=hashlib.sha1)
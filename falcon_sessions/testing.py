@@ -33,15 +33,36 @@ class CacheSessionStorage(AbstractSessionStorage):
     def insert(self, session_key, session_data, expiry_age):
         self._cache[session_key] = session_data
 
+    def load(self, session_key):
+        return self._cache.get(session_key)
+
+    def add(self, session_key, session_data, expiry_age):
+        if session_key in self._cache:
+            return False
+
+        self._cache[session_key] = session_data
+        return True
+
     def read(self, session_key):
         return self._cache.get(session_key, {})
 
     def update(self, session_key, session_data, expiry_age):
         self._cache[session_key] = session_data
 
+    def compare_and_update(self, session_key, session_data, expiry_age, fingerprint):
+        stored_data = self._cache.get(session_key)
+        if stored_data is None or self.get_fingerprint(stored_data) != fingerprint:
+            return False
+
+        self._cache[session_key] = session_data
+        return True
+
     def delete(self, session_key):
         if session_key in self._cache:
             del self._cache[session_key]
 
+    def touch(self, session_key, expiry_age, threshold=0):
+        return session_key in self._cache
+
     def __len__(self):
         return len(self._cache)
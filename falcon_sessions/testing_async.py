@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+from falcon.asgi import App
+from falcon.testing import TestClient, SimpleTestResourceAsync
+
+from .backends.base_async import AbstractAsyncSessionStorage
+
+
+def create_async_client(resource=None, middleware=None):
+    res = resource or SimpleTestResourceAsync()
+
+    app = App(middleware=middleware)
+    app.add_route('/', res)
+
+    client = TestClient(app)
+    client.resource = res
+
+    return client
+
+
+class AsyncCacheSessionStorage(AbstractAsyncSessionStorage):
+
+    def __init__(self, **kwargs):
+        super(AsyncCacheSessionStorage, self).__init__(**kwargs)
+        self._cache = {}
+
+    async def exists(self, session_key):
+        return session_key in self._cache
+
+    async def insert(self, session_key, session_data, expiry_age):
+        self._cache[session_key] = session_data
+
+    async def load(self, session_key):
+        return self._cache.get(session_key)
+
+    async def read(self, session_key):
+        return self._cache.get(session_key, {})
+
+    async def update(self, session_key, session_data, expiry_age):
+        self._cache[session_key] = session_data
+
+    async def delete(self, session_key):
+        if session_key in self._cache:
+            del self._cache[session_key]
+
+    async def touch(self, session_key, expiry_age, threshold=0):
+        return session_key in self._cache
+
+    def __len__(self):
+        return len(self._cache)
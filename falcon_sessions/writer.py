@@ -0,0 +1,282 @@
+from __future__ import unicode_literals
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Write(object):
+
+    """Pending write of a session. Writes of the same session can be
+    merged into one, which is shared by :class:`BackgroundWriter` and
+    :class:`~falcon_sessions.backends.coalescing.CoalescingSessionStorage`.
+
+    :param kind: one of ``UPDATE``, ``UPDATE_FIELDS``, ``TOUCH`` and ``DELETE``
+    :type kind: basestring
+    :param session_data: session data to write
+    :type session_data: dict
+    :param expiry_age: number of seconds until the session expires
+    :type expiry_age: int
+    :param changed_keys: keys changed by an ``UPDATE_FIELDS`` write
+    :type changed_keys: iterable
+    :param deleted_keys: keys deleted by an ``UPDATE_FIELDS`` write
+    :type deleted_keys: iterable
+    :param threshold: refresh threshold of a ``TOUCH`` write. Default: 0
+    :type threshold: float
+    """
+
+    UPDATE = 'update'
+    UPDATE_FIELDS = 'update_fields'
+    TOUCH = 'touch'
+    DELETE = 'delete'
+
+    def __init__(self, kind, session_data=None, expiry_age=None, changed_keys=(), deleted_keys=(), threshold=0):
+        self.kind = kind
+        self.session_data = session_data
+        self.expiry_age = expiry_age
+        self.changed_keys = frozenset(changed_keys)
+        self.deleted_keys = frozenset(deleted_keys)
+        self.threshold = threshold
+        self.submitted_at = time.time()
+
+    def merge(self, write):
+        """Returns a single write equal to this write followed by the given one."""
+        if write.kind == self.TOUCH:
+            if self.kind in (self.UPDATE, self.UPDATE_FIELDS):
+                # The pending write refreshes the expiry as well. The data
+                # of the touch may be older than the pending data
+                self.expiry_age = write.expiry_age
+                return self
+            if self.kind == self.DELETE:
+                return self
+
+        elif write.kind == self.UPDATE_FIELDS:
+            if self.kind in (self.UPDATE, self.UPDATE_FIELDS):
+                # Changes of other keys by the pending write are kept, even
+                # if the given write has been made from older data
+                session_data = dict(self.session_data)
+                for key in write.deleted_keys:
+                    session_data.pop(key, None)
+                for key in write.changed_keys:
+                    if key in write.session_data:
+                        session_data[key] = write.session_data[key]
+                write.session_data = session_data
+
+            if self.kind == self.UPDATE_FIELDS:
+                write.changed_keys, write.deleted_keys = (
+                    (self.changed_keys - write.deleted_keys) | write.changed_keys,
+                    (self.deleted_keys - write.changed_keys) | write.deleted_keys,
+                )
+            else:
+                # Changes of other keys may be pending
+                write.kind = self.UPDATE
+
+        write.submitted_at = self.submitted_at
+        return write
+
+    def execute(self, storage, session_key):
+        """Writes the session to the storage. Returns the result of the
+        storage method.
+        """
+        if self.kind == self.UPDATE:
+            return storage.update(session_key, self.session_data, self.expiry_age)
+        elif self.kind == self.UPDATE_FIELDS:
+            return storage.update_fields(
+                session_key, self.session_data, self.changed_keys, self.deleted_keys, self.expiry_age)
+        elif self.kind == self.TOUCH:
+            if not storage.touch(session_key, self.expiry_age, self.threshold):
+                storage.update(session_key, self.session_data, self.expiry_age)
+        else:
+            return storage.delete(session_key)
+
+
+class BackgroundWriter(object):
+
+    """Writes sessions to a storage in background threads.
+
+    Writes are queued by session key, so a write submitted while an
+    earlier write of the same session is still pending replaces it, and
+    the session is written once. Writes of a session are never executed
+    concurrently.
+
+    Session data is written after the response is sent, so a following
+    request may read the previous data. It suits sessions whose changes
+    can be lost, like last seen time or UI preferences. Deletes are never
+    queued or dropped: pending writes of the session are discarded and
+    the session is deleted in the calling thread.
+
+    Threads are started on the first write, and again in a process forked
+    after that, so the writer can be created before forking workers.
+    Writes pending at the fork are left to the parent process.
+
+    :param storage: storage of sessions
+    :type storage: AbstractSessionStorage
+    :param maxsize: maximum number of pending sessions. Default: 10000
+    :type maxsize: int
+    :param overflow: what to do with writes while ``maxsize`` sessions are
+        pending: ``'sync'`` to write in the calling thread or ``'drop'`` to
+        drop the write. Default: ``'sync'``
+    :type overflow: basestring
+    :param workers: number of writing threads. Default: 1
+    :type workers: int
+    :param late_after: number of seconds after which a written session
+        is counted as late. Default: 1
+    :type late_after: float
+    """
+
+    SYNC = 'sync'
+    DROP = 'drop'
+
+    def __init__(self, storage, maxsize=10000, overflow=SYNC, workers=1, late_after=1):
+        if overflow not in (self.SYNC, self.DROP):
+            raise ValueError("overflow must be either 'sync' or 'drop'")
+
+        self.storage = storage
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.workers = workers
+        self.late_after = late_after
+
+        self.written_count = 0
+        self.coalesced_count = 0
+        self.sync_count = 0
+        self.dropped_count = 0
+        self.late_count = 0
+        self.failed_count = 0
+
+        self._pending = OrderedDict()
+        self._writing = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        pid = os.getpid()
+        if self._pid == pid or self._closed:
+            return
+
+        with self._start_lock:
+            if self._pid == pid:
+                return
+
+            if self._pid is not None:
+                # Threads don't survive a fork, and the state of the
+                # condition and pending writes belongs to the parent
+                self._pending = OrderedDict()
+                self._writing = set()
+                self._condition = threading.Condition()
+
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name='falcon-sessions-writer-{}'.format(i))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            self._pid = pid
+
+    def __len__(self):
+        return len(self._pending)
+
+    def update(self, session_key, session_data, expiry_age):
+        self.submit(session_key, Write(Write.UPDATE, session_data, expiry_age))
+
+    def update_fields(self, session_key, session_data, changed_keys, deleted_keys, expiry_age):
+        self.submit(session_key, Write(
+            Write.UPDATE_FIELDS, session_data, expiry_age, changed_keys, deleted_keys))
+
+    def touch(self, session_key, session_data, expiry_age, threshold=0):
+        """Refreshes session expiry, or writes the session data if the
+        storage can't refresh it separately.
+        """
+        self.submit(session_key, Write(Write.TOUCH, session_data, expiry_age, threshold=threshold))
+
+    def delete(self, session_key):
+        """Deletes the session in the calling thread after discarding its
+        pending writes and waiting for the write in progress.
+        """
+        self._start()
+        with self._condition:
+            if self._pending.pop(session_key, None) is not None:
+                self.coalesced_count += 1
+            while session_key in self._writing:
+                self._condition.wait()
+
+        return self.storage.delete(session_key)
+
+    def submit(self, session_key, write):
+        self._start()
+        with self._condition:
+            pending_write = self._pending.get(session_key)
+            if pending_write is not None:
+                self._pending[session_key] = pending_write.merge(write)
+                self.coalesced_count += 1
+                return
+
+            # Writes of a session being written wait for it even on overflow
+            if (not self._closed and len(self._pending) < self.maxsize) or session_key in self._writing:
+                self._pending[session_key] = write
+                self._condition.notify()
+                return
+
+            if self.overflow == self.DROP and not self._closed:
+                self.dropped_count += 1
+                return
+
+            self.sync_count += 1
+
+        self._execute(session_key, write)
+
+    def _execute(self, session_key, write):
+        try:
+            write.execute(self.storage, session_key)
+        except Exception:
+            self.failed_count += 1
+            logger.exception("Unable to write session")
+        else:
+            self.written_count += 1
+            if time.time() - write.submitted_at > self.late_after:
+                self.late_count += 1
+
+    def _take(self):
+        for session_key, write in self._pending.items():
+            if session_key not in self._writing:
+                del self._pending[session_key]
+                self._writing.add(session_key)
+                return session_key, write
+
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                session_key, write = self._take()
+                while write is None:
+                    if self._closed and not self._pending:
+                        return
+                    self._condition.wait()
+                    session_key, write = self._take()
+
+            try:
+                self._execute(session_key, write)
+            finally:
+                with self._condition:
+                    self._writing.discard(session_key)
+                    # Pending writes of the same session can be taken now
+                    self._condition.notify_all()
+
+    def close(self, timeout=None):
+        """Writes pending sessions and stops the threads. Sessions submitted
+        after closing are written in the calling thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout)
@@ -33,6 +33,8 @@ setuptools.setup(
     install_requires=read_requirements('requirements.txt'),
     setup_requires=['setuptools_scm'],
     extras_require={
-        'redis': read_requirements('requirements-redis.txt')
+        'redis': read_requirements('requirements-redis.txt'),
+        'msgpack': read_requirements('requirements-msgpack.txt'),
+        'compression': read_requirements('requirements-compression.txt'),
     },
 )
@@ -0,0 +1,52 @@
+import unittest
+
+from falcon_sessions.backends.base import CorruptedSessionDataError
+from falcon_sessions.serializers import JSONSerializer
+from falcon_sessions.testing import CacheSessionStorage
+
+
+class TestSessionEncoding(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CacheSessionStorage()
+        self.legacy_session_storage = CacheSessionStorage(legacy_encoding=True)
+        self.session_data = {'user': 1, 'items': [1, 2, 3]}
+
+    def test_binary_format(self):
+        encoded = self.session_storage.encode(self.session_data)
+        self.assertTrue(isinstance(encoded, bytes))
+        self.assertEqual(b'\x01', encoded[:1])
+        self.assertEqual(self.session_data, self.session_storage.decode(encoded))
+        self.assertTrue(len(encoded) < len(self.legacy_session_storage.encode(self.session_data)))
+
+    def test_legacy_format(self):
+        encoded = self.legacy_session_storage.encode(self.session_data)
+        self.assertEqual(self.session_data, self.session_storage.decode(encoded))
+        self.assertEqual(self.session_data, self.session_storage.decode(encoded.encode('ascii')))
+        self.assertEqual(
+            self.session_data,
+            self.legacy_session_storage.decode(self.session_storage.encode(self.session_data)))
+
+    def test_json_serializer(self):
+        session_storage = CacheSessionStorage(serializer=JSONSerializer())
+        encoded = session_storage.encode(self.session_data)
+        self.assertEqual(self.session_data, session_storage.decode(encoded))
+
+    def test_serializer_gets_bytes(self):
+        serializer = JSONSerializer()
+        loads = serializer.loads
+        serializer.loads = lambda data: loads(data) if isinstance(data, bytes) else None
+        session_storage = CacheSessionStorage(serializer=serializer)
+        self.assertEqual(self.session_data, session_storage.decode(session_storage.encode(self.session_data)))
+
+    def test_corrupted_data(self):
+        encoded = self.session_storage.encode(self.session_data)
+        with self.assertRaises(CorruptedSessionDataError):
+            self.session_storage.decode(encoded[:-1] + b'x')
+
+        with self.assertRaises(CorruptedSessionDataError):
+            self.session_storage.decode(encoded[:10])
+
+
+if __name__ == '__main__':
+    unittest.main()
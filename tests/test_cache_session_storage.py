@@ -0,0 +1,101 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+
+from falcon_sessions.backends.cache import CachedSessionStorage, LocalCache
+from falcon_sessions.testing import CacheSessionStorage
+
+
+class TestLocalCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = LocalCache(2, ttl=10, timer=lambda: self.now)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(1, self.cache.get('a'))
+        self.cache.set('c', 3)
+        self.assertTrue('a' in self.cache)
+        self.assertFalse('b' in self.cache)
+        self.assertEqual(2, len(self.cache))
+
+    def test_ttl(self):
+        self.cache.set('a', 1)
+        self.now = 9
+        self.assertEqual(1, self.cache.get('a'))
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestCachedSessionStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = CacheSessionStorage()
+        self.session_storage = CachedSessionStorage(self.storage, ttl=60)
+
+    def test_load_cached(self):
+        session_key = self.session_storage.create({'key': 'value'}, 60)
+        with mock.patch.object(self.storage, 'load') as load:
+            self.assertEqual({'key': 'value'}, self.session_storage.load(session_key))
+        self.assertFalse(load.called)
+
+    def test_load_miss(self):
+        self.assertIsNone(self.session_storage.load('unknown'))
+        self.storage.insert('key', {'key': 'value'}, 60)
+        self.assertEqual({'key': 'value'}, self.session_storage.load('key'))
+        with mock.patch.object(self.storage, 'load') as load:
+            self.assertEqual({'key': 'value'}, self.session_storage.load('key'))
+        self.assertFalse(load.called)
+
+    def test_cached_data_copied(self):
+        session_key = self.session_storage.create({'items': [1]}, 60)
+        self.session_storage.load(session_key)['items'].append(2)
+        self.assertEqual({'items': [1]}, self.session_storage.load(session_key))
+
+    def test_write_through(self):
+        session_key = self.session_storage.create({'key': 'value'}, 60)
+        self.session_storage.update(session_key, {'key': 'other'}, 60)
+        self.assertEqual({'key': 'other'}, self.storage.load(session_key))
+        self.assertEqual({'key': 'other'}, self.session_storage.load(session_key))
+        self.session_storage.delete(session_key)
+        self.assertIsNone(self.session_storage.load(session_key))
+        self.assertFalse(self.session_storage.exists(session_key))
+
+    def test_many_operations(self):
+        session_key = self.session_storage.create({'key': 'value'}, 60)
+        self.storage.insert('other', {'key': 'other'}, 60)
+        with mock.patch.object(self.storage, 'read_many', wraps=self.storage.read_many) as read_many:
+            self.assertEqual(
+                {session_key: {'key': 'value'}, 'other': {'key': 'other'}},
+                self.session_storage.read_many([session_key, 'other', 'unknown']))
+        read_many.assert_called_once_with(['other', 'unknown'])
+
+        self.session_storage.update_many({session_key: {'key': 'new'}}, 60)
+        self.assertEqual({'key': 'new'}, self.storage.load(session_key))
+        self.session_storage.delete_many([session_key, 'other'])
+        self.assertEqual({}, self.session_storage.read_many([session_key, 'other']))
+
+    def test_validate(self):
+        self.storage.supports_versions = True
+        session_storage = CachedSessionStorage(self.storage, ttl=60, validate=True)
+        self.storage.insert('key', {'key': 'value'}, 60)
+        with mock.patch.object(self.storage, 'get_version', create=True, return_value=1):
+            self.assertEqual({'key': 'value'}, session_storage.load('key'))
+            self.storage.insert('key', {'key': 'other'}, 60)
+            self.assertEqual({'key': 'value'}, session_storage.load('key'))
+        with mock.patch.object(self.storage, 'get_version', create=True, return_value=2):
+            self.assertEqual({'key': 'other'}, session_storage.load('key'))
+
+    def test_validate_without_versions(self):
+        with self.assertRaises(ValueError):
+            CachedSessionStorage(self.storage, validate=True)
+        with self.assertRaises(ValueError):
+            CachedSessionStorage(CachedSessionStorage(self.storage), validate=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+import mock
+
+from falcon_sessions.backends.coalescing import CoalescingSessionStorage
+from falcon_sessions.testing import CacheSessionStorage
+
+
+class SlowSessionStorage(CacheSessionStorage):
+
+    """Storage that counts operations and blocks them until it's released."""
+
+    def __init__(self, **kwargs):
+        super(SlowSessionStorage, self).__init__(**kwargs)
+        self.released = threading.Event()
+        self.started = threading.Event()
+        self.load_count = 0
+        self.write_count = 0
+
+    def load(self, session_key):
+        self.load_count += 1
+        session_data = super(SlowSessionStorage, self).load(session_key)
+        self.started.set()
+        self.released.wait(5)
+        if session_data == {'error': True}:
+            raise ValueError
+        return session_data
+
+    def update(self, session_key, session_data, expiry_age):
+        self.write_count += 1
+        self.started.set()
+        self.released.wait(5)
+        super(SlowSessionStorage, self).update(session_key, dict(session_data), expiry_age)
+
+
+class TestCoalescingSessionStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = SlowSessionStorage()
+        self.session_storage = CoalescingSessionStorage(self.storage)
+        self.results = []
+
+    def tearDown(self):
+        self.storage.released.set()
+
+    def run_concurrently(self, *calls):
+        """Runs the first call and, once it reaches the storage, the others."""
+        def run(func, args):
+            try:
+                self.results.append(func(*args))
+            except Exception as e:
+                self.results.append(e)
+
+        threads = [threading.Thread(target=run, args=call) for call in calls]
+        threads[0].start()
+        self.assertTrue(self.storage.started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        # Let the other threads wait for the first one
+        time.sleep(0.1)
+        self.storage.released.set()
+        for thread in threads:
+            thread.join(5)
+
+    def test_single_flight_load(self):
+        self.storage.insert('key', {'cart': [1]}, 60)
+        load = self.session_storage.load
+        self.run_concurrently((load, ('key',)), (load, ('key',)), (load, ('key',)))
+
+        self.assertEqual(1, self.storage.load_count)
+        self.assertEqual(2, self.session_storage.shared_load_count)
+        self.assertEqual([{'cart': [1]}] * 3, self.results)
+        self.results[0]['cart'].append(2)
+        self.assertEqual([1], self.results[1]['cart'])
+
+        self.session_storage.load('key')
+        self.assertEqual(2, self.storage.load_count)
+
+    def test_single_flight_load_error(self):
+        self.storage.insert('key', {'error': True}, 60)
+        load = self.session_storage.load
+        self.run_concurrently((load, ('key',)), (load, ('key',)))
+
+        self.assertEqual(1, self.storage.load_count)
+        self.assertTrue(all(isinstance(result, ValueError) for result in self.results))
+
+    def test_load_after_write_not_shared(self):
+        self.storage.insert('key', {'a': 0}, 60)
+        load = self.session_storage.load
+
+        def update(*args):
+            # Completes without waiting for the load
+            with mock.patch.object(self.storage, 'update') as storage_update:
+                storage_update.side_effect = lambda session_key, session_data, expiry_age: \
+                    CacheSessionStorage.update(self.storage, session_key, session_data, expiry_age)
+                self.session_storage.update('key', {'a': 1}, 60)
+            return load('key')
+
+        self.run_concurrently((load, ('key',)), (update, ()))
+
+        self.assertEqual(2, self.storage.load_count)
+        self.assertEqual(0, self.session_storage.shared_load_count)
+        self.assertEqual([{'a': 0}, {'a': 1}], self.results)
+
+    def test_writes_coalesced(self):
+        self.storage.insert('key', {'a': 0, 'b': 0, 'c': 0}, 60)
+        update_fields = self.session_storage.update_fields
+        self.run_concurrently(
+            (self.session_storage.update, ('key', {'a': 0, 'b': 0, 'c': 0, 'd': 0}, 60)),
+            (update_fields, ('key', {'a': 1, 'b': 0, 'c': 0}, {'a'}, set(), 60)),
+            (update_fields, ('key', {'a': 0, 'b': 2}, {'b'}, {'c'}, 60)),
+        )
+
+        self.assertEqual(2, self.storage.write_count)
+        self.assertEqual(1, self.session_storage.coalesced_count)
+        self.assertEqual({'a': 1, 'b': 2}, self.storage.load('key'))
+
+    def test_writes_of_different_sessions_not_coalesced(self):
+        self.run_concurrently(
+            (self.session_storage.update, ('first', {'a': 1}, 60)),
+            (self.session_storage.update, ('second', {'a': 2}, 60)),
+        )
+
+        self.assertEqual(2, self.storage.write_count)
+        self.assertEqual(0, self.session_storage.coalesced_count)
+        self.assertEqual({'a': 2}, self.storage.load('second'))
+
+    def test_delete_after_update(self):
+        self.storage.insert('key', {'a': 0}, 60)
+        self.run_concurrently(
+            (self.session_storage.update, ('key', {'a': 1}, 60)),
+            (self.session_storage.delete, ('key',)),
+        )
+
+        self.assertEqual(1, self.storage.write_count)
+        self.assertIsNone(self.storage.load('key'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from falcon_sessions import compressors
+from falcon_sessions.compressors import Lz4Compressor, ZlibCompressor, ZstdCompressor, compress, decompress
+from falcon_sessions.serializers import PickleSerializer
+from falcon_sessions.testing import CacheSessionStorage
+
+
+def make_session_data(i):
+    return {'user_id': i, 'cart': [{'sku': 'SKU-{}'.format(j), 'quantity': j} for j in range(i % 50)]}
+
+
+class TestCompressors(unittest.TestCase):
+
+    def setUp(self):
+        self.data = PickleSerializer().dumps(make_session_data(49))
+
+    def assertRoundTrip(self, compressor):
+        compressed = compress(self.data, compressor)
+        self.assertTrue(compressed.startswith(compressors.HEADER + compressor.algorithm))
+        self.assertTrue(len(compressed) < len(self.data))
+        self.assertEqual(self.data, decompress(compressed, compressor))
+        # Readable after switching to another compressor
+        self.assertEqual(self.data, decompress(compressed))
+
+    def test_zlib(self):
+        self.assertRoundTrip(ZlibCompressor(threshold=16))
+
+    @unittest.skipIf(compressors.lz4 is None, 'lz4 is not installed')
+    def test_lz4(self):
+        self.assertRoundTrip(Lz4Compressor(threshold=16))
+
+    @unittest.skipIf(compressors.zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        self.assertRoundTrip(ZstdCompressor(threshold=16))
+
+    @unittest.skipIf(compressors.zstandard is None, 'zstandard is not installed')
+    def test_zstd_dictionary(self):
+        serializer = PickleSerializer()
+        dictionary = ZstdCompressor.train_dictionary(
+            [serializer.dumps(make_session_data(i)) for i in range(1000)], size=4096)
+        compressor = ZstdCompressor(threshold=16, dictionary=dictionary)
+        compressed = compress(self.data, compressor)
+        self.assertTrue(len(compressed) < len(compress(self.data, ZstdCompressor(threshold=16))))
+        self.assertEqual(self.data, decompress(compressed, compressor))
+
+    def test_below_threshold(self):
+        compressor = ZlibCompressor(threshold=len(self.data) + 1)
+        self.assertEqual(self.data, compress(self.data, compressor))
+        self.assertEqual(self.data, decompress(self.data, compressor))
+
+    def test_uncompressed_data_with_header(self):
+        data = b'\x00\x01data'
+        self.assertEqual(data, decompress(compress(data, None)))
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            decompress(compressors.HEADER + b'\xff' + self.data)
+
+
+class TestCompressedSessionStorage(unittest.TestCase):
+
+    def test_encode_and_decode(self):
+        session_data = make_session_data(49)
+        storage = CacheSessionStorage(compressor=ZlibCompressor(threshold=256))
+        encoded = storage.encode(session_data)
+        self.assertTrue(len(encoded) < len(CacheSessionStorage().encode(session_data)))
+        self.assertEqual(session_data, storage.decode(encoded))
+        self.assertEqual(session_data, CacheSessionStorage().decode(encoded))
+        self.assertEqual({'a': 1}, storage.decode(CacheSessionStorage().encode({'a': 1})))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from falcon_sessions.cookies import SessionCookieSigner
+
+
+class TestSessionCookieSigner(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000000
+        self.signer = SessionCookieSigner('secret', max_age=60, timer=lambda: self.now)
+
+    def test_sign_and_unsign(self):
+        value = self.signer.sign('key')
+        self.assertTrue(value.startswith('key.'))
+        self.assertEqual('key', self.signer.unsign(value))
+
+    def test_forged(self):
+        value = self.signer.sign('key')
+        self.assertIsNone(self.signer.unsign('other' + value[3:]))
+        self.assertIsNone(self.signer.unsign(value[:-1]))
+        self.assertIsNone(SessionCookieSigner('other').unsign(value))
+        self.assertIsNone(self.signer.unsign('key'))
+        self.assertIsNone(self.signer.unsign('key.x.y'))
+
+    def test_expired(self):
+        value = self.signer.sign('key')
+        self.now += 60
+        self.assertEqual('key', self.signer.unsign(value))
+        self.now += 1
+        self.assertIsNone(self.signer.unsign(value))
+
+    def test_secret_key_required(self):
+        with self.assertRaises(ValueError):
+            SessionCookieSigner()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+
+from falcon_sessions.backends.negative_cache import NegativeCacheSessionStorage
+from falcon_sessions.testing import CacheSessionStorage
+
+
+class TestNegativeCacheSessionStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = CacheSessionStorage()
+        self.session_storage = NegativeCacheSessionStorage(self.storage)
+
+    def test_missing_key_remembered(self):
+        self.assertIsNone(self.session_storage.load('unknown'))
+        with mock.patch.object(self.storage, 'load') as load:
+            self.assertIsNone(self.session_storage.load('unknown'))
+            self.assertFalse(self.session_storage.exists('unknown'))
+        self.assertFalse(load.called)
+        self.assertEqual(2, self.session_storage.hit_count)
+
+    def test_created_key_forgotten(self):
+        self.assertFalse(self.session_storage.exists('key'))
+        self.assertTrue(self.session_storage.add('key', {'key': 'value'}, 60))
+        self.assertEqual({'key': 'value'}, self.session_storage.load('key'))
+
+    def test_deleted_key_remembered(self):
+        session_key = self.session_storage.create({'key': 'value'}, 60)
+        self.session_storage.delete(session_key)
+        with mock.patch.object(self.storage, 'load') as load:
+            self.assertIsNone(self.session_storage.load(session_key))
+        self.assertFalse(load.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+from __future__ import unicode_literals
+
+import os
+import unittest
+
+from falcon_sessions.backends.cache import CachedSessionStorage
+from falcon_sessions.backends.redis import RedisServer
+from falcon_sessions.backends.redis_hash import RedisHashSessionStorage
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = os.environ.get('REDIS_PORT', 6379)
+REDIS_DB = os.environ.get('REDIS_DB', 1)
+
+
+class TestRedisHashSessionStorage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.session_storage = RedisHashSessionStorage(
+            RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB), prefix='hash')
+
+    def setUp(self):
+        self.session_key = self.session_storage.create({'cart': [1, 2, 3], 'counter': 1}, 60)
+        self.connection = self.session_storage.server.connect(self.session_key)
+        self.real_stored_key = self.session_storage.get_real_stored_key(self.session_key)
+
+    def tearDown(self):
+        self.session_storage.delete(self.session_key)
+
+    def test_create_and_load(self):
+        self.assertEqual(
+            {'cart': [1, 2, 3], 'counter': 1},
+            self.session_storage.load(self.session_key))
+        self.assertEqual(2, self.connection.hlen(self.real_stored_key))
+        self.assertTrue(0 < self.connection.ttl(self.real_stored_key) <= 60)
+        self.assertFalse(self.session_storage.add(self.session_key, {'counter': 2}, 60))
+        self.assertIsNone(self.session_storage.load('some_unknown_key'))
+
+    def test_update_fields(self):
+        cart = self.connection.hget(self.real_stored_key, 'cart')
+        self.session_storage.update_fields(
+            self.session_key, {'counter': 2, 'user': 'x'}, {'counter', 'user'}, {'cart'}, 120)
+        self.assertEqual(
+            {'counter': 2, 'user': 'x'},
+            self.session_storage.load(self.session_key))
+        self.assertTrue(60 < self.connection.ttl(self.real_stored_key) <= 120)
+
+        self.session_storage.update_fields(
+            self.session_key, {'counter': 3, 'cart': [1, 2, 3], 'user': 'x'}, {'counter', 'cart'}, set(), 120)
+        self.assertEqual(cart, self.connection.hget(self.real_stored_key, 'cart'))
+
+    def test_update_fields_of_expired_session(self):
+        self.session_storage.delete(self.session_key)
+        self.session_storage.update_fields(self.session_key, {'counter': 2, 'user': 'x'}, {'counter'}, set(), 60)
+        self.assertEqual({'counter': 2, 'user': 'x'}, self.session_storage.load(self.session_key))
+
+    def test_update(self):
+        self.session_storage.update(self.session_key, {'counter': 2}, 60)
+        self.assertEqual({'counter': 2}, self.session_storage.load(self.session_key))
+
+    def test_load_with_fingerprint(self):
+        session_data, fingerprint = self.session_storage.load_with_fingerprint(self.session_key)
+        self.assertEqual({'cart': [1, 2, 3], 'counter': 1}, session_data)
+        self.assertEqual(fingerprint, self.session_storage.get_fingerprint({'counter': 1, 'cart': [1, 2, 3]}))
+        self.assertNotEqual(fingerprint, self.session_storage.get_fingerprint({'cart': [1, 2, 3], 'counter': 2}))
+
+    def test_compare_and_update(self):
+        session_data, fingerprint = self.session_storage.load_with_fingerprint(self.session_key)
+        self.assertTrue(self.session_storage.compare_and_update(self.session_key, {'counter': 2}, 60, fingerprint))
+        self.assertFalse(self.session_storage.compare_and_update(self.session_key, {'counter': 3}, 60, fingerprint))
+        self.assertEqual({'counter': 2}, self.session_storage.load(self.session_key))
+        self.assertFalse(self.session_storage.compare_and_update('some_unknown_key', {}, 60, fingerprint))
+
+    def test_update_many_and_read_many(self):
+        sessions = {self.session_key: {'counter': 2}, 'other': {'counter': 3}}
+        self.session_storage.update_many(sessions, 60)
+        try:
+            self.assertEqual(sessions, self.session_storage.read_many([self.session_key, 'other', 'unknown']))
+        finally:
+            self.session_storage.delete('other')
+
+    def test_touch(self):
+        self.assertTrue(self.session_storage.touch(self.session_key, 120))
+        self.assertTrue(60 < self.connection.ttl(self.real_stored_key) <= 120)
+
+    def test_cache_validation_rejected(self):
+        with self.assertRaises(ValueError):
+            CachedSessionStorage(self.session_storage, validate=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
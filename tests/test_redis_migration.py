@@ -0,0 +1,117 @@
+from __future__ import unicode_literals
+
+import os
+import unittest
+
+import mock
+import redis
+
+from falcon_sessions.backends.redis import (
+    RedisSessionStorage,
+    RedisServer,
+    RedisPool,
+    WeighedServer
+)
+from falcon_sessions.backends.redis_migration import RedisSessionMigrator
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = os.environ.get('REDIS_PORT', 6379)
+REDIS_DB = int(os.environ.get('REDIS_DB', 1))
+
+restore = redis.StrictRedis.restore
+
+
+def restore_corrupted(self, name, ttl, value, *args, **kwargs):
+    return restore(self, name, ttl, b'corrupted', *args, **kwargs)
+
+
+class TestRedisSessionMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.server1 = RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        self.server2 = RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB + 1)
+        self.previous_server = RedisPool(WeighedServer(1, self.server1))
+        self.server = RedisPool(WeighedServer(1, self.server1), WeighedServer(1, self.server2))
+
+        self.previous_storage = RedisSessionStorage(self.previous_server, prefix='migration')
+        self.storage = RedisSessionStorage(
+            self.server, prefix='migration', previous_server=self.previous_server)
+
+        for server in (self.server1, self.server2):
+            connection = server.connect(None)
+            keys = list(connection.scan_iter(match='migration:*'))
+            if keys:
+                connection.delete(*keys)
+
+        self.session_keys = [
+            self.previous_storage.create({'n': i}, 600) for i in range(50)
+        ]
+        self.moved_keys = [
+            session_key for session_key in self.session_keys
+            if self.server.get_server(session_key) is self.server2
+        ]
+
+    def test_read_moves_session(self):
+        session_key = self.moved_keys[0]
+        self.assertTrue(self.storage.exists(session_key))
+        self.assertIsNotNone(self.storage.load(session_key))
+
+        real_stored_key = self.storage.get_real_stored_key(session_key)
+        self.assertFalse(self.server1.connect(None).exists(real_stored_key))
+        self.assertTrue(0 < self.server2.connect(None).ttl(real_stored_key) <= 600)
+
+    def test_delete_removes_previous_copy(self):
+        session_key = self.moved_keys[0]
+        self.storage.delete(session_key)
+        self.assertFalse(self.storage.exists(session_key))
+
+    def test_migrator(self):
+        migrator = RedisSessionMigrator(self.storage, batch_size=7)
+        migrator.migrate()
+
+        self.assertEqual(len(self.moved_keys), migrator.moved_count)
+        self.assertEqual(0, migrator.skipped_count)
+        self.assertTrue(migrator.scanned_count >= len(self.session_keys))
+
+        plain_storage = RedisSessionStorage(self.server, prefix='migration')
+        for i, session_key in enumerate(self.session_keys):
+            self.assertEqual({'n': i}, plain_storage.load(session_key))
+
+    def test_migrator_keeps_newer_session(self):
+        session_key = self.moved_keys[0]
+        RedisSessionStorage(self.server, prefix='migration').update(session_key, {'n': 'new'}, 600)
+
+        migrator = RedisSessionMigrator(self.storage)
+        migrator.migrate()
+
+        self.assertEqual(1, migrator.skipped_count)
+        self.assertEqual({'n': 'new'}, self.storage.load(session_key))
+        real_stored_key = self.storage.get_real_stored_key(session_key)
+        self.assertFalse(self.server1.connect(None).exists(real_stored_key))
+
+    def test_migrator_keeps_unrestored_session(self):
+        migrator = RedisSessionMigrator(self.storage)
+        with mock.patch.object(redis.client.Pipeline, 'restore', restore_corrupted):
+            migrator.migrate()
+
+        self.assertEqual(len(self.moved_keys), migrator.failed_count)
+        self.assertEqual(0, migrator.moved_count)
+        plain_storage = RedisSessionStorage(self.server, prefix='migration')
+        self.assertIsNone(plain_storage.load(self.moved_keys[0]))
+        self.assertIsNotNone(self.previous_storage.load(self.moved_keys[0]))
+
+    def test_read_keeps_unrestored_session(self):
+        session_key = self.moved_keys[0]
+        with mock.patch.object(redis.StrictRedis, 'restore', restore_corrupted):
+            self.assertEqual({}, self.storage.read(session_key))
+        self.assertIsNotNone(self.previous_storage.load(session_key))
+
+    def test_migrator_requires_prefix(self):
+        with self.assertRaises(ValueError):
+            RedisSessionMigrator(RedisSessionStorage(self.server))
+        migrator = RedisSessionMigrator(RedisSessionStorage(self.server), match='sessions:*')
+        self.assertEqual('sessions:*', migrator.match)
+
+
+if __name__ == '__main__':
+    unittest.main()
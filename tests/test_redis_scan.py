@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import threading
+import time
+import unittest
+from uuid import uuid4
+
+from falcon_sessions import export
+from falcon_sessions.backends.redis import RedisPool, RedisServer, RedisSessionStorage, WeighedServer
+from falcon_sessions.backends.redis_hash import RedisHashSessionStorage
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = os.environ.get('REDIS_PORT', 6379)
+
+
+def create_pool():
+    return RedisPool(
+        WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=1)),
+        WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=2)),
+    )
+
+
+class TestRedisSessionStorageScan(unittest.TestCase):
+
+    storage_class = RedisSessionStorage
+
+    def setUp(self):
+        self.session_storage = self.storage_class(
+            create_pool(), prefix='scan-{}'.format(uuid4().hex), user_index_field='user_id')
+        self.sessions = dict(
+            (self.session_storage.create({'user_id': i % 3, 'i': i}, 60), {'user_id': i % 3, 'i': i})
+            for i in range(25)
+        )
+
+    def tearDown(self):
+        for user_id in range(3):
+            self.session_storage.delete_user_sessions(user_id)
+
+    def test_scan(self):
+        scanned = list(self.session_storage.scan(batch_size=4, queue_size=1))
+        self.assertEqual(self.sessions, dict((key, data) for key, data, ttl in scanned))
+        self.assertTrue(all(0 < ttl <= 60 for key, data, ttl in scanned))
+
+    def test_scan_skips_other_values(self):
+        connection = self.session_storage.server.connect('other')
+        connection.rpush(self.session_storage.get_real_stored_key('list'), 'value')
+        connection.set(self.session_storage.get_real_stored_key('string'), 'value')
+        connection.hset(self.session_storage.get_real_stored_key('hash'), 'key', 'value')
+        try:
+            scanned = list(self.session_storage.scan(batch_size=4))
+        finally:
+            connection.delete(*[self.session_storage.get_real_stored_key(key) for key in ('list', 'string', 'hash')])
+        self.assertEqual(self.sessions, dict((key, data) for key, data, ttl in scanned))
+
+    def test_scan_requires_prefix(self):
+        with self.assertRaises(ValueError):
+            self.storage_class(create_pool()).scan()
+
+    def test_stop_scan(self):
+        threads_count = threading.active_count()
+        for _ in self.session_storage.scan(batch_size=1, queue_size=1):
+            break
+
+        for _ in range(50):
+            if threading.active_count() <= threads_count:
+                break
+            time.sleep(0.1)
+        self.assertEqual(threads_count, threading.active_count())
+
+    def test_export(self):
+        output = io.StringIO()
+        self.assertEqual(25, export.export(self.session_storage, output, batch_size=10))
+        exported = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(self.sessions, dict((line['key'], line['data']) for line in exported))
+
+
+class TestRedisHashSessionStorageScan(TestRedisSessionStorageScan):
+
+    storage_class = RedisHashSessionStorage
+
+
+if __name__ == '__main__':
+    unittest.main()
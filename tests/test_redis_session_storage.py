@@ -3,12 +3,16 @@ from __future__ import unicode_literals
 import os
 import time
 import unittest
+from uuid import uuid4
+
+import mock
 
 from falcon_sessions.session import Session
 from falcon_sessions.backends.redis import (
     RedisSessionStorage,
     RedisServer,
     RedisPool,
+    RedisSentinel,
     WeighedServer
 )
 
@@ -39,6 +43,20 @@ class TestRedisSessionStorage(unittest.TestCase):
         self.session_storage.delete(session_key)
         self.assertFalse(self.session_storage.exists(session_key))
 
+    def test_add(self):
+        session_key = self.session_storage.get_new_session_key()
+        self.assertTrue(self.session_storage.add(session_key, {'key': 'value'}, 60))
+        self.assertFalse(self.session_storage.add(session_key, {'key': 'other'}, 60))
+        self.assertEqual({'key': 'value'}, self.session_storage.read(session_key))
+
+    def test_create_retries_on_collision(self):
+        with mock.patch.object(self.session_storage, 'exists') as exists:
+            with mock.patch.object(self.session_storage, 'add', side_effect=[False, True]) as add:
+                session_key = self.session_storage.create({}, 60)
+        self.assertFalse(exists.called)
+        self.assertEqual(2, add.call_count)
+        self.assertEqual(session_key, add.call_args[0][0])
+
     def test_expiry(self):
         session_key = self.session_storage.create(self.session.data, 1)
         self.assertTrue(self.session_storage.exists(session_key))
@@ -53,6 +71,164 @@ class TestRedisSessionStorage(unittest.TestCase):
         session_data = self.session_storage.read(session_key)
         self.assertEqual(8, session_data.get('item_test'))
 
+    def test_load(self):
+        self.assertIsNone(self.session_storage.load('some_unknown_key'))
+        self.session['key'] = 'value'
+        session_key = self.session_storage.create(self.session.data, expiry_age=60)
+        self.assertEqual({'key': 'value'}, self.session_storage.load(session_key))
+
+    def test_load_with_fingerprint(self):
+        self.assertIsNone(self.session_storage.load_with_fingerprint('some_unknown_key'))
+        session_key = self.session_storage.create({'key': 'value'}, expiry_age=60)
+        session_data, fingerprint = self.session_storage.load_with_fingerprint(session_key)
+        self.assertEqual({'key': 'value'}, session_data)
+        self.assertEqual(fingerprint, self.session_storage.get_fingerprint({'key': 'value'}))
+        self.assertNotEqual(fingerprint, self.session_storage.get_fingerprint({'key': 'other'}))
+
+    def test_compare_and_update(self):
+        self.assertFalse(self.session_storage.compare_and_update('some_unknown_key', {}, 60, 'fingerprint'))
+        session_key = self.session_storage.create({'key': 'value'}, expiry_age=60)
+        session_data, fingerprint = self.session_storage.load_with_fingerprint(session_key)
+        self.assertTrue(self.session_storage.compare_and_update(session_key, {'key': 'first'}, 120, fingerprint))
+        self.assertFalse(self.session_storage.compare_and_update(session_key, {'key': 'second'}, 120, fingerprint))
+        self.assertEqual({'key': 'first'}, self.session_storage.load(session_key))
+        connection = self.session_storage.server.connect(session_key)
+        self.assertTrue(60 < connection.ttl(session_key) <= 120)
+
+    def test_get_version(self):
+        self.assertIsNone(self.session_storage.get_version('some_unknown_key'))
+        session_key = self.session_storage.create({'key': 'value'}, expiry_age=60)
+        version = self.session_storage.get_version(session_key)
+        self.session_storage.update(session_key, {'key': 'value'}, 60)
+        self.assertEqual(version, self.session_storage.get_version(session_key))
+        self.session_storage.update(session_key, {'key': 'other'}, 60)
+        self.assertNotEqual(version, self.session_storage.get_version(session_key))
+
+    def test_get_version_legacy_encoding(self):
+        session_storage = RedisSessionStorage(self.session_storage.server, legacy_encoding=True)
+        session_key = session_storage.create({'key': 'value'}, expiry_age=60)
+        version = session_storage.get_version(session_key)
+        session_storage.update(session_key, {'key': 'other'}, 60)
+        self.assertNotEqual(version, session_storage.get_version(session_key))
+
+    def test_touch(self):
+        self.assertFalse(self.session_storage.touch('some_unknown_key', 60))
+        session_key = self.session_storage.create(self.session.data, expiry_age=60)
+        connection = self.session_storage.server.connect(session_key)
+        self.assertTrue(self.session_storage.touch(session_key, 120))
+        self.assertTrue(60 < connection.ttl(session_key) <= 120)
+
+    def test_touch_threshold(self):
+        self.assertFalse(self.session_storage.touch('some_unknown_key', 60, threshold=0.5))
+        session_key = self.session_storage.create(self.session.data, expiry_age=150)
+        connection = self.session_storage.server.connect(session_key)
+        self.assertTrue(self.session_storage.touch(session_key, 200, threshold=0.5))
+        self.assertTrue(connection.ttl(session_key) <= 150)
+        self.assertTrue(self.session_storage.touch(session_key, 200, threshold=0.2))
+        self.assertTrue(150 < connection.ttl(session_key) <= 200)
+
+
+class TestRedisSessionStorageManyOperations(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.session_storage = RedisSessionStorage(RedisPool(
+            WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=1)),
+            WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=2)),
+        ), prefix='many')
+        cls.session_storage.batch_size = 3
+
+    def setUp(self):
+        self.sessions = dict(('key{}'.format(i), {'i': i}) for i in range(10))
+        self.session_storage.update_many(self.sessions, 60)
+
+    def tearDown(self):
+        self.session_storage.delete_many(self.sessions)
+
+    def test_update_many_and_read_many(self):
+        servers = set(self.session_storage.server.get_server(key).name for key in self.sessions)
+        self.assertEqual(2, len(servers))
+        self.assertEqual(self.sessions, self.session_storage.read_many(list(self.sessions) + ['unknown']))
+        self.assertEqual({'i': 3}, self.session_storage.load('key3'))
+
+    def test_delete_many(self):
+        self.assertEqual(2, self.session_storage.delete_many(['key1', 'key2', 'unknown']))
+        self.assertEqual(set(self.sessions) - {'key1', 'key2'}, set(self.session_storage.read_many(self.sessions)))
+
+    def test_touch_many(self):
+        self.assertEqual(['key1', 'key2'], sorted(self.session_storage.touch_many(['key1', 'key2', 'unknown'], 120)))
+        connection = self.session_storage.server.connect('key1')
+        self.assertTrue(60 < connection.ttl(self.session_storage.get_real_stored_key('key1')) <= 120)
+
+
+class TestRedisSessionStorageUserIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.session_storage = RedisSessionStorage(RedisPool(
+            WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=1)),
+            WeighedServer(1, RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=2)),
+        ), prefix='indexed', user_index_field='user_id')
+
+    def setUp(self):
+        self.user_id = uuid4().hex
+        self.session_keys = [self.session_storage.create({'user_id': self.user_id}, 60) for _ in range(5)]
+
+    def tearDown(self):
+        self.session_storage.delete_many(self.session_keys)
+
+    def test_get_user_session_keys(self):
+        other_session_key = self.session_storage.create({'user_id': 'other'}, 60)
+        self.session_keys.append(other_session_key)
+        self.assertEqual(
+            sorted(self.session_keys[:5]), sorted(self.session_storage.get_user_session_keys(self.user_id)))
+
+    def test_stale_sessions_pruned(self):
+        self.session_storage.update(self.session_keys[0], {'user_id': 'other'}, 60)
+        self.session_storage.delete(self.session_keys[1])
+        self.assertEqual(
+            sorted(self.session_keys[2:]), sorted(self.session_storage.get_user_session_keys(self.user_id)))
+
+        index_key = self.session_storage.get_user_index_key(self.user_id)
+        connection = self.session_storage.server.connect(index_key)
+        self.assertEqual(3, connection.scard(self.session_storage.get_real_stored_key(index_key)))
+
+    def test_delete_user_sessions(self):
+        self.assertEqual(5, self.session_storage.delete_user_sessions(self.user_id))
+        self.assertEqual({}, self.session_storage.read_many(self.session_keys))
+        self.assertEqual([], self.session_storage.get_user_session_keys(self.user_id))
+
+    def test_index_expires_after_sessions(self):
+        index_key = self.session_storage.get_user_index_key(self.user_id)
+        real_stored_key = self.session_storage.get_real_stored_key(index_key)
+        connection = self.session_storage.server.connect(index_key)
+        self.session_storage.update(self.session_keys[0], {'user_id': self.user_id}, 120)
+        self.session_storage.update(self.session_keys[1], {'user_id': self.user_id}, 30)
+        self.assertTrue(60 < connection.ttl(real_stored_key) <= 120)
+
+    def test_user_id_of_other_type(self):
+        user_id = uuid4().int
+        session_key = self.session_storage.create({'user_id': user_id}, 60)
+        self.session_keys.append(session_key)
+        self.assertEqual([session_key], self.session_storage.get_user_session_keys(str(user_id)))
+        self.assertEqual([session_key], self.session_storage.get_user_session_keys(user_id))
+        self.session_storage.delete_user_sessions(user_id)
+
+    def test_touch_many_extends_index(self):
+        index_key = self.session_storage.get_user_index_key(self.user_id)
+        real_stored_key = self.session_storage.get_real_stored_key(index_key)
+        connection = self.session_storage.server.connect(index_key)
+        connection.expire(real_stored_key, 10)
+        self.assertEqual(
+            sorted(self.session_keys[:2]),
+            sorted(self.session_storage.touch_many(self.session_keys[:2] + ['unknown'], 1000)))
+        self.assertTrue(900 < connection.ttl(real_stored_key) <= 1000)
+
+    def test_touch_writes_indexed_session(self):
+        self.assertFalse(self.session_storage.touch(self.session_keys[0], 120))
+        self.assertTrue(self.session_storage.touch(self.session_keys[0], 100, threshold=0.5))
+        self.assertFalse(self.session_storage.touch(self.session_keys[0], 100, threshold=0.1))
+
 
 class TestRedisPool(unittest.TestCase):
 
@@ -63,23 +239,23 @@ class TestRedisPool(unittest.TestCase):
         )
 
         keys1 = (
-            'm8f0os91g40fsq8eul6tejqpp6k22',
             'kcffsbb5o272et1d5e6ib7gh75pd9',
             'gqldpha87m8183vl9s8uqobcr2ws3',
             'ukb9bg2jifrr60fstla67knjv3e32',
             'k3dranjfna7fv7ijpofs6l6bj2pw1',
-            'an4no833idr9jddr960r8ikai5nh3',
             '16b9gardpcscrj5q4a4kf3c4u7tq8',
-            'etdefnorfbvfc165c5airu77p2pl9',
             'mr778ou0sqqme21gjdiu4drtc0bv4',
-            'ctkgd8knu5hukdrdue6im28p90kt7'
+            'ctkgd8knu5hukdrdue6im28p90kt7',
+            'prsv0trk66jc100pipm6bb78c3pl2',
+            'bv2uc3q48rm8ubipjmolgnhul0ou3',
         )
 
         keys2 = (
+            'm8f0os91g40fsq8eul6tejqpp6k22',
+            'an4no833idr9jddr960r8ikai5nh3',
+            'etdefnorfbvfc165c5airu77p2pl9',
             'jgpsbmjj6030fdr3aefg37nq47nb8',
-            'prsv0trk66jc100pipm6bb78c3pl2',
             '84ksqj2vqral7c6ped9hcnq940qq1',
-            'bv2uc3q48rm8ubipjmolgnhul0ou3',
             '6c8oph72pfsg3db37qsefn3746fg4',
             'tbc0sjtl2bkp5i9n2j2jiqf4r0bg9',
             'v0on9rorn71913o3rpqhvkknc1wm5',
@@ -96,6 +272,38 @@ class TestRedisPool(unittest.TestCase):
             server = pool._get_server(key)
             self.assertEqual('localhost2', server.host)
 
+    def test_redis_pool_weights(self):
+        pool = RedisPool(
+            WeighedServer(1, RedisServer(host='localhost1')),
+            WeighedServer(3, RedisServer(host='localhost2'))
+        )
+        hosts = [pool._get_server(uuid4().hex).host for _ in range(10000)]
+        self.assertTrue(0.2 < hosts.count('localhost1') / 10000.0 < 0.3)
+
+    def test_redis_pool_add_server(self):
+        servers = [
+            WeighedServer(1, RedisServer(host='localhost1')),
+            WeighedServer(1, RedisServer(host='localhost2')),
+        ]
+        pool = RedisPool(*servers)
+        new_pool = RedisPool(*(servers + [WeighedServer(1, RedisServer(host='localhost3'))]))
+
+        moved = 0
+        for _ in range(10000):
+            key = uuid4().hex
+            new_host = new_pool._get_server(key).host
+            if new_host != pool._get_server(key).host:
+                self.assertEqual('localhost3', new_host)
+                moved += 1
+        self.assertTrue(0.25 < moved / 10000.0 < 0.42)
+
+    def test_redis_pool_unique_names(self):
+        with self.assertRaises(ValueError):
+            RedisPool(
+                WeighedServer(1, RedisServer(host='localhost1')),
+                WeighedServer(1, RedisServer(host='localhost1'))
+            )
+
 
 class TestRedisServer(unittest.TestCase):
 
@@ -109,6 +317,53 @@ class TestRedisServer(unittest.TestCase):
         connection = server.connect('')
         self.assertFalse(connection.exists('some_unknown_key'))
 
+    def test_connection_reused(self):
+        server = RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, max_connections=2)
+        connection = server.connect('a')
+        self.assertIs(connection, server.connect('b'))
+        self.assertEqual(2, connection.connection_pool.max_connections)
+
+    def test_disconnect(self):
+        server = RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        connection = server.connect('')
+        server.disconnect()
+        self.assertIsNot(connection, server.connect(''))
+
+
+class TestRedisSentinel(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('redis.sentinel.Sentinel')
+        self.sentinel_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.discover_master = self.sentinel_class.return_value.discover_master
+        self.discover_master.return_value = (REDIS_HOST, int(REDIS_PORT))
+
+    def test_master_discovered_once(self):
+        server = RedisSentinel([('sentinel', 26379)], 'mymaster', db=REDIS_DB)
+        connection = server.connect('a')
+        self.assertIs(connection, server.connect('b'))
+        self.assertFalse(connection.exists('some_unknown_key'))
+        self.assertEqual(1, self.discover_master.call_count)
+        self.assertEqual(1, self.sentinel_class.call_count)
+        self.assertEqual(0, server.failover_count)
+
+    def test_refresh_interval(self):
+        server = RedisSentinel([('sentinel', 26379)], 'mymaster', sentinel_refresh_interval=0)
+        connection = server.connect('')
+        self.assertIs(connection, server.connect(''))
+        self.assertEqual(2, self.discover_master.call_count)
+
+    def test_failover_on_connection_error(self):
+        self.discover_master.side_effect = [
+            ('localhost', 1),
+            (REDIS_HOST, int(REDIS_PORT)),
+        ]
+        server = RedisSentinel([('sentinel', 26379)], 'mymaster', db=REDIS_DB)
+        self.assertFalse(server.connect('').exists('some_unknown_key'))
+        self.assertEqual(1, server.failover_count)
+        self.assertEqual((REDIS_HOST, int(REDIS_PORT)), server.master_address)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+from __future__ import unicode_literals
+
+import asyncio
+import os
+import unittest
+
+from falcon_sessions.backends.redis import RedisSessionStorage, RedisServer, WeighedServer
+from falcon_sessions.backends.redis_async import (
+    AsyncRedisSessionStorage,
+    AsyncRedisServer,
+    AsyncRedisPool
+)
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = os.environ.get('REDIS_PORT', 6379)
+REDIS_DB = os.environ.get('REDIS_DB', 1)
+
+
+class TestAsyncRedisSessionStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = AsyncRedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        self.session_storage = AsyncRedisSessionStorage(self.server)
+
+    def tearDown(self):
+        self.run_async(self.server.disconnect())
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_non_existing(self):
+        self.assertFalse(self.run_async(self.session_storage.exists('some_unknown_key')))
+        self.assertIsNone(self.run_async(self.session_storage.load('some_unknown_key')))
+
+    def test_create_load_delete(self):
+        session_key = self.run_async(self.session_storage.create({'key': 'value'}, 60))
+        self.assertTrue(self.run_async(self.session_storage.exists(session_key)))
+        self.assertEqual({'key': 'value'}, self.run_async(self.session_storage.load(session_key)))
+        self.assertFalse(self.run_async(self.session_storage.add(session_key, {}, 60)))
+        self.run_async(self.session_storage.delete(session_key))
+        self.assertFalse(self.run_async(self.session_storage.exists(session_key)))
+
+    def test_touch(self):
+        session_key = self.run_async(self.session_storage.create({'key': 'value'}, 60))
+        self.assertTrue(self.run_async(self.session_storage.touch(session_key, 120)))
+        self.assertTrue(self.run_async(self.session_storage.touch(session_key, 120, threshold=0.5)))
+        self.assertFalse(self.run_async(self.session_storage.touch('some_unknown_key', 120)))
+
+    def test_compatible_with_sync_storage(self):
+        sync_storage = RedisSessionStorage(RedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB))
+        session_key = sync_storage.create({'key': 'value'}, 60)
+        self.assertEqual({'key': 'value'}, self.run_async(self.session_storage.load(session_key)))
+
+    def test_pool(self):
+        pool = AsyncRedisPool(
+            WeighedServer(1, AsyncRedisServer(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)),
+            WeighedServer(1, AsyncRedisServer(host=REDIS_HOST, port=REDIS_PORT, db=int(REDIS_DB) + 1))
+        )
+        session_storage = AsyncRedisSessionStorage(pool)
+        session_key = self.run_async(session_storage.create({'key': 'value'}, 60))
+        self.assertEqual({'key': 'value'}, self.run_async(session_storage.load(session_key)))
+        self.run_async(pool.disconnect())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+
+import mock
+import redis
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
+from falcon_sessions.backends.redis import RedisSessionStorage, RedisServer
+from falcon_sessions.backends.redis_tracking import TrackingRedisSessionStorage
+
+REDIS_SERVER_BIN = os.environ.get('REDIS_SERVER_BIN') or which('redis-server')
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@unittest.skipIf(REDIS_SERVER_BIN is None, 'redis-server is not available')
+class TestTrackingRedisSessionStorage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        cls.port = sock.getsockname()[1]
+        sock.close()
+
+        cls.directory = tempfile.mkdtemp()
+        cls.devnull = open(os.devnull, 'wb')
+        cls.process = subprocess.Popen(
+            [REDIS_SERVER_BIN, '--port', str(cls.port), '--save', '', '--dir', cls.directory],
+            stdout=cls.devnull
+        )
+        client = redis.StrictRedis(port=cls.port)
+        wait_for(lambda: cls._ping(client), timeout=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.process.terminate()
+        cls.process.wait()
+        cls.devnull.close()
+        shutil.rmtree(cls.directory)
+
+    @staticmethod
+    def _ping(client):
+        try:
+            return client.ping()
+        except redis.ConnectionError:
+            return False
+
+    def setUp(self):
+        self.server = RedisServer(host='127.0.0.1', port=self.port)
+        self.session_storage = TrackingRedisSessionStorage(self.server, prefix='tracking')
+        self.writer_storage = RedisSessionStorage(
+            RedisServer(host='127.0.0.1', port=self.port), prefix='tracking')
+        self.session_key = self.writer_storage.create({'key': 'value'}, 60)
+
+        tracker = self.session_storage.get_tracker(self.session_key)
+        self.assertTrue(wait_for(lambda: tracker.available))
+
+    def tearDown(self):
+        self.session_storage.close()
+
+    def test_cached_read(self):
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+        connection = self.server.connect(self.session_key)
+        connection.get = None
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+
+    def test_cached_read_after_idle_time(self):
+        tracker = self.session_storage.get_tracker(self.session_key)
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+        time.sleep(tracker.ping_interval * 1.5)
+        self.assertTrue(tracker.available)
+        self.assertEqual(0, tracker.invalidation_count)
+
+        connection = self.server.connect(self.session_key)
+        connection.get = None
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+
+    def test_trackers_restarted_after_fork(self):
+        tracker = self.session_storage.get_tracker(self.session_key)
+        with mock.patch('falcon_sessions.backends.redis_tracking.os.getpid', return_value=-1):
+            child_tracker = self.session_storage.get_tracker(self.session_key)
+        tracker.stop()
+        self.assertIsNot(tracker, child_tracker)
+        self.assertFalse(tracker.available)
+        self.assertTrue(wait_for(lambda: child_tracker.available))
+
+    def test_invalidation(self):
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+        self.writer_storage.update(self.session_key, {'key': 'other'}, 60)
+        self.assertTrue(wait_for(
+            lambda: self.session_storage.load(self.session_key) == {'key': 'other'}))
+
+        self.writer_storage.delete(self.session_key)
+        self.assertTrue(wait_for(
+            lambda: self.session_storage.load(self.session_key) is None))
+
+    def test_own_write(self):
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+        self.session_storage.update(self.session_key, {'key': 'other'}, 60)
+        self.assertEqual({'key': 'other'}, self.session_storage.load(self.session_key))
+
+    def test_fallback_without_tracking(self):
+        tracker = self.session_storage.get_tracker(self.session_key)
+        tracker.available = False
+        self.assertEqual({'key': 'value'}, self.session_storage.load(self.session_key))
+        self.assertEqual(0, len(tracker.cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
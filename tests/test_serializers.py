@@ -0,0 +1,80 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+from falcon_sessions import serializers
+from falcon_sessions.serializers import JSONSerializer, MsgpackSerializer, PickleSerializer
+
+
+class Point(object):
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class TestSerializers(unittest.TestCase):
+
+    def test_pickle(self):
+        serializer = PickleSerializer()
+        data = {'user': 1, 'expiry': timedelta(days=1)}
+        self.assertEqual(data, serializer.loads(serializer.dumps(data)))
+
+    def test_json(self):
+        serializer = JSONSerializer()
+        data = {'user': 1, 'items': [1, 2]}
+        self.assertEqual(data, serializer.loads(serializer.dumps(data)))
+
+
+@unittest.skipIf(serializers.msgpack is None, 'msgpack is not installed')
+class TestMsgpackSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.serializer = MsgpackSerializer()
+
+    def assertRoundTrip(self, data):
+        self.assertEqual(data, self.serializer.loads(self.serializer.dumps(data)))
+
+    def test_builtin_types(self):
+        self.assertRoundTrip({'user': 1, 'name': 'name', 'token': b'\x00\xff', 'items': [1.5, None, True]})
+
+    def test_non_string_keys(self):
+        self.assertRoundTrip({1: 'one'})
+
+    def test_extension_types(self):
+        self.assertRoundTrip({
+            '_session_expiry': datetime(2020, 1, 2, 3, 4, 5, 6),
+            'birthday': date(2000, 1, 2),
+            'lifetime': timedelta(days=1, seconds=2, microseconds=3),
+            'tags': {'a', 'b'},
+            'roles': frozenset([1, 2]),
+            'nested': {'dates': {date(2000, 1, 2)}},
+        })
+
+    def test_aware_datetime(self):
+        if serializers.timezone is None:
+            self.skipTest('datetime.timezone is not available')
+
+        value = datetime(2020, 1, 2, 3, 4, 5, tzinfo=serializers.timezone(timedelta(hours=3)))
+        loaded = self.serializer.loads(self.serializer.dumps(value))
+        self.assertEqual(value, loaded)
+        self.assertEqual(timedelta(hours=3), loaded.utcoffset())
+
+    def test_register(self):
+        self.serializer.register(
+            Point, 10,
+            lambda point: self.serializer.dumps([point.x, point.y]),
+            lambda data: Point(*self.serializer.loads(data)))
+        point = self.serializer.loads(self.serializer.dumps({'point': Point(1, 2)}))['point']
+        self.assertEqual((1, 2), (point.x, point.y))
+
+    def test_register_duplicate_code(self):
+        with self.assertRaises(ValueError):
+            self.serializer.register(Point, MsgpackSerializer.SET, repr, repr)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            self.serializer.dumps({'point': Point(1, 2)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -116,6 +116,80 @@ class TestSession(unittest.TestCase):
         self.assertTrue(self.session.accessed)
         self.assertTrue(self.session.modified)
 
+    def test_changed_keys(self):
+        self.session['x'] = 1
+        self.session.update({'y': 2})
+        self.session.setdefault('z', 3)
+        self.session.setdefault('z', 4)
+        self.assertEqual({'x', 'y', 'z'}, self.session.changed_keys)
+        self.assertEqual(set(), self.session.deleted_keys)
+
+    def test_changed_keys_of_update_with_pairs(self):
+        self.session.update([('a', 1), ('b', 2)])
+        self.session.update(iter([('c', 3)]))
+        self.assertEqual({'a': 1, 'b': 2, 'c': 3}, self.session.data)
+        self.assertEqual({'a', 'b', 'c'}, self.session.changed_keys)
+
+    def test_deleted_keys(self):
+        session = Session(key='key', data={'x': 1, 'y': 2, 'z': 3})
+        del session['x']
+        session.pop('y')
+        session.pop('unknown', None)
+        session['z'] = 4
+        session['x'] = 5
+        self.assertEqual({'y'}, session.deleted_keys)
+        self.assertEqual({'x', 'z'}, session.changed_keys)
+        self.assertFalse(session.cleared)
+
+    def test_cleared(self):
+        self.session['x'] = 1
+        self.session.clear()
+        self.session['y'] = 2
+        self.assertTrue(self.session.cleared)
+        self.assertEqual({'y'}, self.session.changed_keys)
+
+
+class TestLazySession(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return {'x': 1}
+
+    def test_load_on_access(self):
+        session = Session(key='key', loader=self.load)
+        self.assertFalse(session.loaded)
+        self.assertEqual(0, self.loads)
+        self.assertEqual(1, session['x'])
+        self.assertTrue(session.loaded)
+        self.assertTrue(session.accessed)
+        self.assertEqual({'x': 1}, session.data)
+        self.assertEqual(1, self.loads)
+
+    def test_set_keeps_loaded_data(self):
+        session = Session(key='key', loader=self.load)
+        session['y'] = 2
+        self.assertEqual({'x': 1, 'y': 2}, session.data)
+
+    def test_clear_verifies_key(self):
+        session = Session(key='key', loader=self.load)
+        session.clear()
+        self.assertEqual({}, session.data)
+        self.assertEqual(1, self.loads)
+        self.assertEqual('key', session.key)
+
+        session = Session(key='forged', loader=lambda: None)
+        session.clear()
+        self.assertIsNone(session.key)
+
+    def test_missing_session(self):
+        session = Session(key='key', loader=lambda: None)
+        self.assertEqual('key', session.key)
+        self.assertIsNone(session.get('x'))
+        self.assertIsNone(session.key)
+
 
 if __name__ == '__main__':
     unittest.main()
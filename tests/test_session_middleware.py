@@ -1,6 +1,10 @@
+import copy
 import unittest
 from datetime import datetime, timedelta
 
+import mock
+
+from falcon_sessions.cookies import SessionCookieSigner
 from falcon_sessions.middleware import SessionMiddleware
 from falcon_sessions.testing import create_client, CacheSessionStorage
 
@@ -11,12 +15,37 @@ class UpdateSessionResource(object):
         req.session['test'] = 'data'
 
 
+class ReadSessionResource(object):
+
+    def on_get(self, req, resp, **params):
+        req.session.get('cart')
+
+
+class AppendToSessionListResource(object):
+
+    def on_get(self, req, resp, **params):
+        req.session['cart'].append(3)
+
+
+class AppendToSessionDataListResource(object):
+
+    def on_get(self, req, resp, **params):
+        req.session.data['cart'].append(3)
+
+
 class ClearSessionResource(object):
 
     def on_get(self, req, resp, **params):
         req.session.clear()
 
 
+class LoginResource(object):
+
+    def on_get(self, req, resp, **params):
+        req.session.clear()
+        req.session['user_id'] = 42
+
+
 class SetCustomSessionExpiryResource(object):
 
     def __init__(self, expiry):
@@ -54,6 +83,28 @@ class TestSessionMiddleware(unittest.TestCase):
         self.assertEqual(session_data, self.session_storage.read(session_key))
         self.assertTrue('session' not in resp.cookies)
 
+    def test_existent_session_loaded_in_one_call(self):
+        client = create_client(
+            middleware=self.session_middleware
+        )
+        session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(session_key, {'test': 'data'}, 24 * 3600)
+        with mock.patch.object(self.session_storage, 'exists') as exists:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        self.assertFalse(exists.called)
+
+    def test_update_changed_fields(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(session_key, {'other': 'data'}, 24 * 3600)
+        with mock.patch.object(self.session_storage, 'update_fields') as update_fields:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        update_fields.assert_called_once_with(
+            session_key, {'other': 'data', 'test': 'data'}, {'test'}, set(), 14 * 86400)
+
     def test_non_existent_session(self):
         client = create_client(
             middleware=self.session_middleware
@@ -146,6 +197,291 @@ class TestSessionMiddleware(unittest.TestCase):
         self.assertEqual(None, resp.cookies['session'].max_age)
         self.assertEqual('Cookie', resp.headers['Vary'])
 
+    def test_refresh_unmodified_session_with_touch(self):
+        self.session_middleware.session_refresh_each_request = True
+        client = create_client(
+            middleware=self.session_middleware
+        )
+        session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(session_key, {'test': 'data'}, 24 * 3600)
+        with mock.patch.object(self.session_storage, 'update') as update:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        self.assertFalse(update.called)
+        self.assertEqual(session_key, resp.cookies['session'].value)
+        self.assertEqual(14 * 86400, resp.cookies['session'].max_age)
+
+    def test_refresh_unmodified_session_without_touch(self):
+        self.session_middleware.session_refresh_each_request = True
+        client = create_client(
+            middleware=self.session_middleware
+        )
+        session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(session_key, {'test': 'data'}, 24 * 3600)
+        with mock.patch.object(self.session_storage, 'touch', return_value=False):
+            with mock.patch.object(self.session_storage, 'update') as update:
+                client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        update.assert_called_once_with(session_key, {'test': 'data'}, 14 * 86400)
+
+
+class TestLazySessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CacheSessionStorage()
+        self.session_middleware = SessionMiddleware(self.session_storage, session_lazy_load=True)
+        self.session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(self.session_key, {'test': 'data'}, 24 * 3600)
+
+    def test_untouched_session_not_loaded(self):
+        client = create_client(
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'load') as load:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertFalse(load.called)
+        self.assertTrue('session' not in resp.cookies)
+        self.assertTrue('Vary' not in resp.headers)
+
+    def test_touched_session_loaded(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual({'test': 'data'}, self.session_storage.read(self.session_key))
+        self.assertTrue('session' in resp.cookies)
+        self.assertEqual('Cookie', resp.headers['Vary'])
+
+    def test_non_existent_session(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=unknown'})
+        self.assertEqual(2, len(self.session_storage))
+        self.assertNotEqual('unknown', resp.cookies['session'].value)
+
+    def test_cleared_non_existent_session_gets_new_key(self):
+        client = create_client(
+            resource=LoginResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=forged'})
+        self.assertFalse(self.session_storage.exists('forged'))
+        session_key = resp.cookies['session'].value
+        self.assertNotEqual('forged', session_key)
+        self.assertEqual({'user_id': 42}, self.session_storage.read(session_key))
+
+
+class TestSkipUnchangedSessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CacheSessionStorage()
+        self.session_middleware = SessionMiddleware(self.session_storage, session_skip_unchanged=True)
+        self.session_key = self.session_storage.get_new_session_key()
+
+    def test_unchanged_session_not_saved(self):
+        self.session_storage.insert(self.session_key, {'test': 'data'}, 24 * 3600)
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update_fields') as update_fields:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertFalse(update_fields.called)
+        self.assertTrue('session' not in resp.cookies)
+        self.assertEqual('Cookie', resp.headers['Vary'])
+
+    def test_unchanged_lazy_session_not_saved(self):
+        self.session_middleware.session_lazy_load = True
+        self.session_storage.insert(self.session_key, {'test': 'data'}, 24 * 3600)
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update_fields') as update_fields:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertFalse(update_fields.called)
+        self.assertTrue('session' not in resp.cookies)
+
+    def test_changed_session_saved(self):
+        self.session_storage.insert(self.session_key, {'test': 'other'}, 24 * 3600)
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual({'test': 'data'}, self.session_storage.read(self.session_key))
+        self.assertEqual(self.session_key, resp.cookies['session'].value)
+
+
+class TestDetectNestedChangesSessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CacheSessionStorage()
+        self.session_middleware = SessionMiddleware(self.session_storage, session_detect_nested_changes=True)
+        self.session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(self.session_key, {'cart': [1, 2]}, 24 * 3600)
+
+    def test_nested_change_saved(self):
+        client = create_client(
+            resource=AppendToSessionListResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update') as update:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        update.assert_called_once_with(self.session_key, {'cart': [1, 2, 3]}, 14 * 86400)
+        self.assertEqual(self.session_key, resp.cookies['session'].value)
+
+    def test_nested_change_through_data_saved(self):
+        client = create_client(
+            resource=AppendToSessionDataListResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update') as update:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        update.assert_called_once_with(self.session_key, {'cart': [1, 2, 3]}, 14 * 86400)
+
+    def test_accessed_session_not_saved(self):
+        client = create_client(
+            resource=ReadSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update') as update:
+            resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertFalse(update.called)
+        self.assertTrue('session' not in resp.cookies)
+        self.assertEqual('Cookie', resp.headers['Vary'])
+
+    def test_modified_session_saved_whole(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update') as update:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        update.assert_called_once_with(self.session_key, {'cart': [1, 2], 'test': 'data'}, 14 * 86400)
+
+
+class CopyingSessionStorage(CacheSessionStorage):
+
+    def load(self, session_key):
+        return copy.deepcopy(super(CopyingSessionStorage, self).load(session_key))
+
+
+class ConcurrentUpdateSessionResource(object):
+
+    """Updates the session as if a concurrent request did."""
+
+    def __init__(self, session_storage):
+        self.session_storage = session_storage
+
+    def on_get(self, req, resp, **params):
+        req.session['test'] = 'data'
+        del req.session['cart']
+        self.session_storage.update(req.session.key, {'cart': [1], 'other': 'data'}, 60)
+
+
+class ConcurrentDeleteSessionResource(object):
+
+    """Deletes the session as if a concurrent logout did."""
+
+    def __init__(self, session_storage):
+        self.session_storage = session_storage
+
+    def on_get(self, req, resp, **params):
+        req.session['test'] = 'data'
+        self.session_storage.delete(req.session.key)
+
+
+class TestOptimisticLockingSessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CopyingSessionStorage()
+        self.session_middleware = SessionMiddleware(self.session_storage, session_optimistic_locking=True)
+        self.session_key = self.session_storage.get_new_session_key()
+        self.session_storage.insert(self.session_key, {'cart': [1, 2]}, 24 * 3600)
+
+    def test_unchanged_session_saved(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'update') as update:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertFalse(update.called)
+        self.assertEqual({'cart': [1, 2], 'test': 'data'}, self.session_storage.load(self.session_key))
+
+    def test_changes_applied_to_concurrent_changes(self):
+        client = create_client(
+            resource=ConcurrentUpdateSessionResource(self.session_storage),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(
+                self.session_storage, 'compare_and_update',
+                wraps=self.session_storage.compare_and_update) as compare_and_update:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual(2, compare_and_update.call_count)
+        self.assertEqual({'other': 'data', 'test': 'data'}, self.session_storage.load(self.session_key))
+
+    def test_overwritten_after_retries(self):
+        client = create_client(
+            resource=ConcurrentUpdateSessionResource(self.session_storage),
+            middleware=SessionMiddleware(
+                self.session_storage, session_optimistic_locking=True, session_conflict_retries=1)
+        )
+        with mock.patch.object(self.session_storage, 'compare_and_update', return_value=False) as compare_and_update:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual(2, compare_and_update.call_count)
+        self.assertEqual({'other': 'data', 'test': 'data'}, self.session_storage.load(self.session_key))
+
+    def test_deleted_session_not_saved(self):
+        client = create_client(
+            resource=ConcurrentDeleteSessionResource(self.session_storage),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertIsNone(self.session_storage.load(self.session_key))
+        self.assertTrue(datetime.utcnow() > resp.cookies['session'].expires)
+
+
+class TestSignedCookieSessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = CacheSessionStorage()
+        self.cookie_signer = SessionCookieSigner('secret')
+        self.session_middleware = SessionMiddleware(
+            self.session_storage, session_cookie_signer=self.cookie_signer)
+
+    def test_create_session(self):
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/')
+        session_key = self.cookie_signer.unsign(resp.cookies['session'].value)
+        self.assertEqual({'test': 'data'}, self.session_storage.read(session_key))
+
+    def test_existent_session(self):
+        session_key = self.session_storage.create({'test': 'data'}, 24 * 3600)
+        client = create_client(
+            resource=ReadSessionResource(),
+            middleware=self.session_middleware
+        )
+        cookie = self.cookie_signer.sign(session_key)
+        with mock.patch.object(self.session_storage, 'load', return_value={'test': 'data'}) as load:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % cookie})
+        load.assert_called_once_with(session_key)
+
+    def test_forged_cookie_not_looked_up(self):
+        session_key = self.session_storage.create({'test': 'data'}, 24 * 3600)
+        client = create_client(
+            resource=ReadSessionResource(),
+            middleware=self.session_middleware
+        )
+        with mock.patch.object(self.session_storage, 'load') as load:
+            client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        self.assertFalse(load.called)
+
 
 if __name__ == '__main__':
     unittest.main()
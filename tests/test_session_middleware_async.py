@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from falcon_sessions.middleware_async import AsyncSessionMiddleware
+from falcon_sessions.testing_async import create_async_client, AsyncCacheSessionStorage
+from falcon_sessions.writer import BackgroundWriter
+
+
+class UpdateSessionResource(object):
+
+    async def on_get(self, req, resp, **params):
+        req.session['test'] = 'data'
+
+
+class ClearSessionResource(object):
+
+    async def on_get(self, req, resp, **params):
+        req.session.clear()
+
+
+class TestAsyncSessionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.session_storage = AsyncCacheSessionStorage()
+        self.session_middleware = AsyncSessionMiddleware(self.session_storage)
+        self.session_key = 'existing'
+        self.session_storage._cache[self.session_key] = {'test': 'existing'}
+
+    def test_create_session(self):
+        client = create_async_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/')
+        self.assertEqual(2, len(self.session_storage))
+        self.assertTrue('session' in resp.cookies)
+        self.assertEqual('Cookie', resp.headers['Vary'])
+
+    def test_existent_session(self):
+        client = create_async_client(
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual(1, len(self.session_storage))
+        self.assertTrue('session' not in resp.cookies)
+
+    def test_update_session(self):
+        client = create_async_client(
+            resource=UpdateSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual({'test': 'data'}, self.session_storage._cache[self.session_key])
+        self.assertEqual(self.session_key, resp.cookies['session'].value)
+
+    def test_clear_session_and_unset_cookies(self):
+        client = create_async_client(
+            resource=ClearSessionResource(),
+            middleware=self.session_middleware
+        )
+        resp = client.simulate_get('/', headers={'Cookie': 'session=%s' % self.session_key})
+        self.assertEqual(0, len(self.session_storage))
+        self.assertEqual('', resp.cookies['session'].value)
+
+    def test_unsupported_options(self):
+        for option in AsyncSessionMiddleware.unsupported_options:
+            with self.assertRaises(ValueError):
+                AsyncSessionMiddleware(self.session_storage, **{option: True})
+        writer = BackgroundWriter(self.session_storage)
+        try:
+            with self.assertRaises(ValueError):
+                AsyncSessionMiddleware(self.session_storage, session_writer=writer)
+        finally:
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
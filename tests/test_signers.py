@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+import unittest
+
+from falcon_sessions.backends.base import CorruptedSessionDataError
+from falcon_sessions.signers import Blake2Signer, Django14Signer, HmacSigner, Sha1Signer
+from falcon_sessions.testing import CacheSessionStorage
+
+
+class TestSigners(unittest.TestCase):
+
+    def test_sha1(self):
+        signer = Sha1Signer()
+        self.assertEqual(hashlib.sha1(b'value').digest(), signer.get_digest(b'value'))
+        self.assertEqual(hashlib.sha1(b'value').hexdigest(), signer.get_signature(b'value'))
+        self.assertEqual(20, signer.digest_size)
+
+    def test_hmac(self):
+        signer = HmacSigner('secret')
+        expected = hmac.new(b'secret', b'value', hashlib.sha256)
+        self.assertEqual(expected.digest(), signer.get_digest(b'value'))
+        self.assertEqual(expected.hexdigest(), signer.get_signature(b'value'))
+        # The keyed state isn't changed by signing
+        self.assertEqual(expected.digest(), signer.get_digest(b'value'))
+        self.assertEqual(32, signer.digest_size)
+
+    @unittest.skipIf(not hasattr(hashlib, 'blake2b'), 'BLAKE2 is not available')
+    def test_blake2(self):
+        signer = Blake2Signer(b'secret', digest_size=16)
+        expected = hashlib.blake2b(b'value', key=b'secret', digest_size=16)
+        self.assertEqual(expected.digest(), signer.get_digest(b'value'))
+        self.assertEqual(expected.digest(), signer.get_digest(b'value'))
+        self.assertEqual(16, signer.digest_size)
+
+    def test_django14(self):
+        signer = Django14Signer('secret', 'django.contrib.sessions.backends.db.SessionStore')
+        key = hashlib.sha1(b'django.contrib.sessionsdjango.contrib.sessions.backends.db.SessionStoresecret').digest()
+        expected = hmac.new(key, b'value', hashlib.sha1)
+        self.assertEqual(expected.hexdigest(), signer.get_signature(b'value'))
+        self.assertEqual(expected.digest(), signer.get_digest(b'value'))
+        self.assertEqual(20, signer.digest_size)
+
+    def test_forged_data_rejected(self):
+        session_storage = CacheSessionStorage(signer=HmacSigner('secret'))
+        forged = CacheSessionStorage(signer=HmacSigner('other')).encode({'user': 1})
+        with self.assertRaises(CorruptedSessionDataError):
+            session_storage.decode(forged)
+
+        self.assertEqual({'user': 1}, session_storage.decode(session_storage.encode({'user': 1})))
+
+
+if __name__ == '__main__':
+    unittest.main()
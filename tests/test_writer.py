@@ -0,0 +1,187 @@
+from __future__ import unicode_literals
+
+import os
+import threading
+import unittest
+
+import mock
+
+from falcon_sessions.middleware import SessionMiddleware
+from falcon_sessions.testing import create_client, CacheSessionStorage
+from falcon_sessions.writer import BackgroundWriter, Write
+
+
+class BlockingSessionStorage(CacheSessionStorage):
+
+    """Storage that blocks writes until it's released."""
+
+    def __init__(self, **kwargs):
+        super(BlockingSessionStorage, self).__init__(**kwargs)
+        self.released = threading.Event()
+        self.writing = threading.Event()
+
+    def update(self, session_key, session_data, expiry_age):
+        self.writing.set()
+        self.released.wait(5)
+        super(BlockingSessionStorage, self).update(session_key, session_data, expiry_age)
+
+
+class UpdateSessionResource(object):
+
+    def on_get(self, req, resp, **params):
+        req.session['test'] = 'data'
+
+
+class TestWrite(unittest.TestCase):
+
+    def test_merge_update_fields(self):
+        write = Write(Write.UPDATE_FIELDS, {'a': 1, 'b': 1}, 60, changed_keys={'a'})
+        write = write.merge(Write(Write.UPDATE_FIELDS, {'a': 0, 'b': 2}, 120, changed_keys={'b'}))
+        self.assertEqual(Write.UPDATE_FIELDS, write.kind)
+        self.assertEqual({'a': 1, 'b': 2}, write.session_data)
+        self.assertEqual({'a', 'b'}, write.changed_keys)
+        self.assertEqual(120, write.expiry_age)
+
+    def test_merge_touch(self):
+        write = Write(Write.UPDATE, {'a': 1}, 60).merge(Write(Write.TOUCH, {'a': 0}, 120))
+        self.assertEqual(Write.UPDATE, write.kind)
+        self.assertEqual({'a': 1}, write.session_data)
+        self.assertEqual(120, write.expiry_age)
+
+
+class TestBackgroundWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = BlockingSessionStorage()
+        self.writer = BackgroundWriter(self.storage, maxsize=2)
+
+    def tearDown(self):
+        self.storage.released.set()
+        self.writer.close()
+
+    def block(self):
+        self.writer.update('blocking', {'key': 'value'}, 60)
+        self.assertTrue(self.storage.writing.wait(5))
+
+    def test_write(self):
+        self.storage.released.set()
+        self.writer.update('key', {'key': 'value'}, 60)
+        self.writer.close()
+        self.assertEqual({'key': 'value'}, self.storage.load('key'))
+        self.assertEqual(1, self.writer.written_count)
+
+    def test_coalesce(self):
+        self.block()
+        with mock.patch.object(self.storage, 'update_fields', create=True) as update_fields:
+            self.writer.update_fields('key', {'a': 1, 'b': 1}, {'a'}, {'c'}, 60)
+            self.writer.update_fields('key', {'b': 2}, {'b'}, {'a'}, 60)
+            self.storage.released.set()
+            self.writer.close()
+
+        update_fields.assert_called_once_with('key', {'b': 2}, {'b'}, {'a', 'c'}, 60)
+        self.assertEqual(1, self.writer.coalesced_count)
+
+    def test_coalesce_touch(self):
+        self.block()
+        self.writer.update('key', {'a': 1}, 60)
+        self.writer.touch('key', {'a': 1}, 120)
+        self.storage.released.set()
+        self.writer.close()
+        self.assertEqual({'a': 1}, self.storage.load('key'))
+        self.assertEqual(1, self.writer.coalesced_count)
+
+    def test_touch_keeps_pending_data(self):
+        self.block()
+        self.writer.update('key', {'cart': [1]}, 60)
+        self.writer.touch('key', {'cart': []}, 120)
+        with mock.patch.object(self.storage, 'update', wraps=self.storage.update) as update:
+            self.storage.released.set()
+            self.writer.close()
+        update.assert_called_once_with('key', {'cart': [1]}, 120)
+        self.assertEqual({'cart': [1]}, self.storage.load('key'))
+
+    def test_overflow_sync(self):
+        self.block()
+        self.writer.touch('a', {}, 60)
+        self.writer.touch('b', {}, 60)
+        self.storage.insert('c', {'c': 1}, 60)
+        with mock.patch.object(self.storage, 'touch', return_value=True) as touch:
+            self.writer.touch('c', {'c': 1}, 60)
+        touch.assert_called_once_with('c', 60, 0)
+        self.assertEqual(1, self.writer.sync_count)
+
+    def test_overflow_drop(self):
+        self.writer.overflow = BackgroundWriter.DROP
+        self.block()
+        self.writer.touch('a', {}, 60)
+        self.writer.touch('b', {}, 60)
+        self.storage.insert('c', {'c': 1}, 60)
+        self.writer.update('c', {'c': 2}, 60)
+        self.storage.released.set()
+        self.writer.close()
+        self.assertEqual({'c': 1}, self.storage.load('c'))
+        self.assertEqual(1, self.writer.dropped_count)
+
+    def test_delete_not_queued(self):
+        self.writer.overflow = BackgroundWriter.DROP
+        self.block()
+        self.writer.update('a', {'a': 1}, 60)
+        self.writer.update('b', {'b': 1}, 60)
+        self.storage.insert('c', {'c': 1}, 60)
+        self.writer.delete('c')
+        self.assertIsNone(self.storage.load('c'))
+
+        # The pending write of the session is discarded
+        self.writer.delete('a')
+        self.storage.released.set()
+        self.writer.close()
+        self.assertIsNone(self.storage.load('a'))
+        self.assertEqual({'b': 1}, self.storage.load('b'))
+        self.assertEqual(0, self.writer.dropped_count)
+
+    def test_delete_waits_for_write_in_progress(self):
+        self.block()
+        threading.Timer(0.1, self.storage.released.set).start()
+        self.writer.delete('blocking')
+        self.assertIsNone(self.storage.load('blocking'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'fork is not available')
+    def test_fork(self):
+        self.storage.released.set()
+        self.writer.update('parent', {'key': 'value'}, 60)
+        pid = os.fork()
+        if pid == 0:
+            # The writer of the child process has no threads until it writes
+            code = 1
+            try:
+                self.writer.update('child', {'key': 'value'}, 60)
+                self.writer.close(timeout=5)
+                if self.storage.load('child') == {'key': 'value'} and not len(self.writer):
+                    code = 0
+            finally:
+                os._exit(code)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, status)
+
+    def test_write_after_close(self):
+        self.storage.released.set()
+        self.writer.close()
+        self.writer.update('key', {'key': 'value'}, 60)
+        self.assertEqual({'key': 'value'}, self.storage.load('key'))
+
+    def test_middleware(self):
+        self.storage.released.set()
+        session_key = self.storage.create({'test': 'other'}, 60)
+        client = create_client(
+            resource=UpdateSessionResource(),
+            middleware=SessionMiddleware(self.storage, session_writer=self.writer)
+        )
+        client.simulate_get('/', headers={'Cookie': 'session=%s' % session_key})
+        self.writer.close()
+        self.assertEqual({'test': 'data'}, self.storage.load(session_key))
+        self.assertEqual(1, self.writer.written_count)
+
+
+if __name__ == '__main__':
+    unittest.main()